@@ -0,0 +1,111 @@
+import argparse
+import xgboost as xgb
+import lightgbm as lgb
+import daal4py as d4p
+import time
+from bench_utils import *
+
+N_PERF_RUNS = 3
+N_ITER = 100
+DTYPE=np.float32
+
+xgb_params = {
+    "reg_alpha": 0.9,
+    "max_bin": 256,
+    "scale_pos_weight": 2,
+    "learning_rate": 0.1,
+    "subsample": 1,
+    "reg_lambda": 1,
+    "min_child_weight": 0,
+    "max_depth": 8,
+    "max_leaves": 256,
+    "tree_method": "hist",
+    "objective": "binary:logistic"
+}
+
+lgb_params = {
+    "reg_alpha": 0.9,
+    "max_bin": 256,
+    "scale_pos_weight": 2,
+    "learning_rate": 0.1,
+    "subsample": 1,
+    "reg_lambda": 1,
+    "min_child_weight": 0,
+    "max_depth": 8,
+    "max_leaves": 256,
+    "objective": "binary",
+    "verbose": -1
+}
+
+
+def xgb_build():
+    global dtrain
+    dtrain = xgb.DMatrix(x_train, y_train)
+
+def xgb_train():
+    global model_xgb
+    model_xgb = xgb.train(xgb_params, dtrain, N_ITER)
+
+def lgb_build():
+    global ltrain
+    ltrain = lgb.Dataset(x_train, y_train.astype(DTYPE), params=lgb_params, free_raw_data=False).construct()
+
+def lgb_train():
+    global model_lgb
+    model_lgb = lgb.train(lgb_params, ltrain, N_ITER)
+
+def xgb_daal_predict():
+    d4p.gbt_classification_prediction(nClasses = 2, resultsToEvaluate="computeClassLabels", fptype='float').compute(x_test, daal_model)
+
+
+def run_layout(name, loader):
+    global x_train, y_train, x_test, y_test, daal_model
+    x_train, y_train, x_test, y_test, n_classes = loader(DTYPE)
+    print("%s: x_train %s, %.1f MB in memory" % (name, x_train.shape, matrix_nbytes(x_train) / 2**20))
+
+    results = {'matrix MB': matrix_nbytes(x_train) / 2**20}
+    # the cache returns memory maps; paged in first, they are not counted as DMatrix memory
+    page_in(x_train, y_train)
+    with memory_phase(name + " DMatrix") as mem:
+        xgb_build()
+    results['DMatrix RSS MB'] = mem.stats['rss_delta'] / 2**20
+    results['DMatrix peak MB'] = mem.stats['peak_delta'] / 2**20
+    results['DMatrix build s'] = measure(xgb_build, name + " DMatrix build     ", N_PERF_RUNS)
+    results['XGB train s'] = measure(xgb_train, name + " XGBOOST training  ", N_PERF_RUNS)
+    results['LGB Dataset s'] = measure(lgb_build, name + " lgb.Dataset build ", N_PERF_RUNS)
+    results['LGB train s'] = measure(lgb_train, name + " LGB training      ", N_PERF_RUNS)
+    daal_model = d4p.get_gbt_model_from_xgboost(model_xgb)
+    results['Daal predict s'] = measure(xgb_daal_predict, name + " XGBOOST Daal predict", N_PERF_RUNS)
+    return results
+
+
+def parse_args():
+    global N_PERF_RUNS, N_ITER
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
+    parser.add_argument('--n_iter', default=N_ITER, required=False, type=int)
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    N_PERF_RUNS = args.n_runs
+    N_ITER = args.n_iter
+
+
+def main():
+    parse_args()
+
+    try:
+        os.mkdir(DATASET_DIR)
+    except:
+        pass
+
+    dense = run_layout("dense ", load_airline_one_hot)
+    csr = run_layout("sparse", load_airline_one_hot_sparse)
+
+    print("\n%-16s %12s %12s" % ("", "dense", "sparse"))
+    for key in dense:
+        print("%-16s %12.3f %12.3f" % (key, dense[key], csr[key]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,467 @@
+"""
+Training and prediction engines for bench_runner.py.
+
+A backend gets the loaded data set as a dict (x_train, y_train, x_test,
+y_test, n_classes, dataset, cat_features). It does its untimed preparation
+in setup(), and phases() returns the (label, callable) pairs that are timed
+with measure(), in order: "construction" builds the training matrix that
+"training" then reuses, so the two are timed and measured separately.
+Backends that run in the same process share trained models through
+`shared`, so a daal4py backend reuses the booster trained by the stock
+backend instead of training its own.
+
+To add an engine, subclass Backend and decorate it with
+@register_backend("name"); it then shows up in bench_runner.py --backends.
+"""
+import os
+import atexit
+import shutil
+import timeit
+import tempfile
+import numpy as np
+import bench_utils
+
+BACKENDS = {}
+
+XGB_PRESETS = {
+    'binary': {
+        "reg_alpha": 0.9,
+        "max_bin": 256,
+        "scale_pos_weight": 2,
+        "learning_rate": 0.1,
+        "subsample": 1,
+        "reg_lambda": 1,
+        "min_child_weight": 0,
+        "max_depth": 8,
+        "max_leaves": 256,
+        "n_estimators": 1000,
+        "tree_method": "hist",
+        "verbosity": 0
+    },
+    'msrank': {
+        "max_bin": 256,
+        "learning_rate": 0.3,
+        "subsample": 1,
+        "reg_lambda": 2,
+        "min_child_weight": 1,
+        "min_split_loss": 0.1,
+        "max_depth": 8,
+        "n_estimators": 200,
+        "tree_method": "hist",
+        "verbosity": 0
+    },
+}
+
+LGB_PRESETS = {
+    'binary': {
+        "reg_alpha": 0.9,
+        "max_bin": 256,
+        "scale_pos_weight": 2,
+        "learning_rate": 0.1,
+        "subsample": 1,
+        "reg_lambda": 1,
+        "min_child_weight": 0,
+        "max_depth": 8,
+        "max_leaves": 256,
+        "n_estimators": 1000,
+        "verbose": -1
+    },
+    'msrank': {
+        "max_bin": 256,
+        "learning_rate": 0.3,
+        "subsample": 1,
+        "reg_lambda": 2,
+        "min_child_weight": 1,
+        "min_split_gain": 0.1,
+        "max_depth": 8,
+        "max_leaves": 256,
+        "n_estimators": 200,
+        "verbose": -1
+    },
+}
+
+# Parameter preset per data set; anything not listed uses 'binary'.
+DATASET_PRESETS = {
+    'msrank-10k': 'msrank',
+}
+
+
+def register_backend(name):
+    def decorator(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def xgb_params_for(data, preset=None):
+    preset = preset or DATASET_PRESETS.get(data['dataset'], 'binary')
+    params = dict(XGB_PRESETS[preset])
+    if data['n_classes'] == -1:
+        params['objective'] = 'reg:squarederror'
+    elif data['n_classes'] == 2:
+        params['objective'] = 'binary:logistic'
+    else:
+        params['objective'] = 'multi:softprob'
+        params['num_class'] = data['n_classes']
+        params.pop('scale_pos_weight', None)
+    return params
+
+
+def lgb_params_for(data, preset=None):
+    preset = preset or DATASET_PRESETS.get(data['dataset'], 'binary')
+    params = dict(LGB_PRESETS[preset])
+    if data['n_classes'] == -1:
+        params['objective'] = 'regression'
+    elif data['n_classes'] == 2:
+        params['objective'] = 'binary'
+    else:
+        params['objective'] = 'multiclass'
+        params['num_class'] = data['n_classes']
+        params.pop('scale_pos_weight', None)
+    return params
+
+
+class Backend(object):
+    name = None
+    # trains its own model and implements fit_curve()
+    trainable = False
+
+    def __init__(self, data, n_iter=None, preset=None, shared=None, n_threads=None):
+        self.data = data
+        self.n_iter = n_iter
+        self.preset = preset
+        self.shared = shared if shared is not None else {}
+        self.n_threads = n_threads
+
+    def setup(self):
+        pass
+
+    def phases(self):
+        return []
+
+    def _check_curve(self):
+        if self.data['n_classes'] < 2:
+            raise ValueError("logloss curves need a classification data set")
+
+
+@register_backend("xgb-stock")
+class XGBStock(Backend):
+    shared_key = 'xgb'
+    trainable = True
+
+    def setup(self):
+        import xgboost  # keep the import out of the timed construction
+        self.xgb = xgboost
+        self.params = xgb_params_for(self.data, self.preset)
+        n_estimators = self.params.pop('n_estimators')
+        self.n_iter = self.n_iter or n_estimators
+        if self.n_threads:
+            self.params['nthread'] = self.n_threads
+        cat_features = self.data['cat_features']
+        n_features = self.data['x_train'].shape[1]
+        self.feature_types = ['c' if i in cat_features else 'q' for i in range(n_features)]
+
+    def make_dmatrix(self, x, label=None, quantile=False):
+        xgb = self.xgb
+        if quantile:
+            # XGBoost cannot save the binned form; QuantileDMatrix at least bins
+            # once here instead of inside the first training call
+            matrix, kwargs = xgb.QuantileDMatrix, {'max_bin': self.params['max_bin']}
+        else:
+            matrix, kwargs = xgb.DMatrix, {}
+        if self.n_threads:
+            kwargs['nthread'] = self.n_threads
+        if self.data['cat_features']:
+            return matrix(x, label=label, feature_types=self.feature_types, enable_categorical=True, **kwargs)
+        return matrix(x, label=label, **kwargs)
+
+    def construct(self):
+        self.dtrain = self.make_dmatrix(self.data['x_train'], label=self.data['y_train'],
+                                        quantile=bench_utils.QUANTIZED_CACHE)
+
+    def fit(self):
+        self.model = self.xgb.train(self.params, self.dtrain, self.n_iter)
+        self.shared[self.shared_key] = self.model
+
+    def predict(self):
+        self.prediction = self.model.predict(self.make_dmatrix(self.data['x_test']))
+
+    def phases(self):
+        return [("construction", self.construct), ("training", self.fit), ("predict", self.predict)]
+
+    def fit_curve(self):
+        """
+        Builds the training matrix and trains with x_test/y_test as eval set.
+        Returns [(round, seconds since start, test logloss)], one per round;
+        the seconds include matrix construction and per-round evaluation,
+        but not building the eval set.
+        """
+        xgb = self.xgb
+        self._check_curve()
+        params = dict(self.params, eval_metric='logloss' if self.data['n_classes'] == 2 else 'mlogloss')
+        curve = []
+
+        class Recorder(xgb.callback.TrainingCallback):
+            def after_iteration(self, model, epoch, evals_log):
+                curve.append((epoch + 1, timeit.default_timer() - start, evals_log['test'][params['eval_metric']][-1]))
+                return False
+
+        dtest = self.make_dmatrix(self.data['x_test'], label=self.data['y_test'])
+        start = timeit.default_timer()
+        self.construct()
+        self.model = xgb.train(params, self.dtrain, self.n_iter, evals=[(dtest, 'test')],
+                               callbacks=[Recorder()], verbose_eval=False)
+        self.shared[self.shared_key] = self.model
+        return curve
+
+
+@register_backend("lgb-stock")
+class LGBStock(Backend):
+    shared_key = 'lgb'
+    trainable = True
+
+    def setup(self):
+        import lightgbm  # keep the import out of the timed construction
+        self.lgb = lightgbm
+        self.params = lgb_params_for(self.data, self.preset)
+        n_estimators = self.params.pop('n_estimators')
+        self.n_iter = self.n_iter or n_estimators
+        if self.n_threads:
+            self.params['num_threads'] = self.n_threads
+
+    def construct(self):
+        categorical = self.data['cat_features'] or 'auto'
+        if bench_utils.QUANTIZED_CACHE:
+            self.dtrain = bench_utils.lgb_quantized_dataset(self.data['dataset'], self.data['x_train'],
+                                                            self.data['y_train'], self.params, categorical)
+        else:
+            self.dtrain = self.lgb.Dataset(self.data['x_train'], self.data['y_train'], params=self.params,
+                                           categorical_feature=categorical).construct()
+
+    def fit(self):
+        self.model = self.lgb.train(self.params, self.dtrain, self.n_iter)
+        self.shared[self.shared_key] = self.model
+
+    def predict(self):
+        self.prediction = self.model.predict(self.data['x_test'])
+
+    def phases(self):
+        return [("construction", self.construct), ("training", self.fit), ("predict", self.predict)]
+
+    def fit_curve(self):
+        lgb = self.lgb
+        self._check_curve()
+        self.params['metric'] = 'binary_logloss' if self.data['n_classes'] == 2 else 'multi_logloss'
+        curve = []
+
+        def record(env):
+            curve.append((env.iteration + 1, timeit.default_timer() - start, env.evaluation_result_list[0][2]))
+
+        # the eval set is binned with the training set's bins, so it can only be
+        # built after it; its construction is kept out of the curve, as in XGBStock
+        built = timeit.default_timer()
+        self.construct()
+        construction = timeit.default_timer() - built
+        dtest = lgb.Dataset(self.data['x_test'], self.data['y_test'], params=self.params,
+                            reference=self.dtrain).construct()
+        start = timeit.default_timer() - construction
+        self.model = lgb.train(self.params, self.dtrain, self.n_iter, valid_sets=[dtest], valid_names=['test'],
+                               callbacks=[record])
+        self.shared[self.shared_key] = self.model
+        return curve
+
+
+# Bytes of x_train the out-of-core backends hold per chunk.
+EXTMEM_CHUNK_BYTES = 64 * 2**20
+
+
+class RowChunks(object):
+    """
+    x_train in row ranges of about EXTMEM_CHUNK_BYTES. A data set cache
+    memory map is read from its .npy file range by range, so at most one
+    chunk is resident; anything else is sliced in place. Close it, or use
+    it as a context manager, once the matrix is built.
+    """
+
+    def __init__(self, x, chunk_bytes=EXTMEM_CHUNK_BYTES):
+        path = bench_utils.npy_file(x)
+        self.rows = bench_utils.NpyRows(path) if path else None
+        self.x = x
+        self.n_rows = x.shape[0]
+        self.chunk_rows = max(1024, chunk_bytes // max(1, x.dtype.itemsize * x.shape[1]))
+
+    def __len__(self):
+        return self.n_rows
+
+    def read(self, start, stop):
+        chunk = self.rows.read(start, stop) if self.rows else self.x[start:stop]
+        return chunk.toarray() if hasattr(chunk, 'toarray') else np.asarray(chunk)
+
+    def bounds(self):
+        return [(start, min(start + self.chunk_rows, self.n_rows)) for start in range(0, self.n_rows, self.chunk_rows)]
+
+    def close(self):
+        if self.rows:
+            self.rows.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@register_backend("xgb-extmem")
+class XGBExtMem(XGBStock):
+    """XGBoost external memory: x_train streamed through a DataIter, pages cached on disk under DATASET_DIR."""
+
+    def setup(self):
+        XGBStock.setup(self)
+        if self.data['cat_features']:
+            raise ValueError("%s trains numerical features only" % self.name)
+        self.cache_dir = None
+
+    def construct(self):
+        xgb = self.xgb
+        chunks = RowChunks(self.data['x_train'])
+        label = self.data['y_train']
+        if self.cache_dir:
+            self.dtrain = None  # frees the previous matrix and its page files first
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.cache_dir = tempfile.mkdtemp(prefix="xgb-extmem-", dir=bench_utils.DATASET_DIR)
+        atexit.register(shutil.rmtree, self.cache_dir, True)
+
+        class ChunkIter(xgb.DataIter):
+            def __init__(self, cache_prefix):
+                self.bounds = chunks.bounds()
+                self.chunk = 0
+                xgb.DataIter.__init__(self, cache_prefix=cache_prefix)
+
+            def next(self, input_data):
+                if self.chunk == len(self.bounds):
+                    return 0
+                start, stop = self.bounds[self.chunk]
+                input_data(data=chunks.read(start, stop), label=label[start:stop])
+                self.chunk += 1
+                return 1
+
+            def reset(self):
+                self.chunk = 0
+
+        kwargs = {'nthread': self.n_threads} if self.n_threads else {}
+        # the pages are cached on disk while the DMatrix is built, so the file can be closed after
+        with chunks:
+            self.dtrain = xgb.DMatrix(ChunkIter(os.path.join(self.cache_dir, "train")), **kwargs)
+
+
+@register_backend("lgb-extmem")
+class LGBExtMem(LGBStock):
+    """LightGBM Dataset built from an lgb.Sequence over x_train chunks instead of one in-memory array."""
+
+    def construct(self):
+        lgb = self.lgb
+        chunks = RowChunks(self.data['x_train'])
+
+        class Rows(lgb.Sequence):
+            batch_size = chunks.chunk_rows
+
+            def __getitem__(self, index):
+                if isinstance(index, slice):
+                    start, stop, _ = index.indices(len(chunks))
+                    return chunks.read(start, stop)
+                # single rows are only read for the bin boundary sample, which LightGBM wants as double
+                return chunks.read(int(index), int(index) + 1)[0].astype(np.float64)
+
+            def __len__(self):
+                return len(chunks)
+
+        with chunks:
+            self.dtrain = lgb.Dataset(Rows(), self.data['y_train'], params=self.params,
+                                      categorical_feature=self.data['cat_features'] or 'auto').construct()
+
+
+class ConvertedBackend(Backend):
+    """Base for engines that predict with a conversion of the booster trained by `source`."""
+    source = None
+
+    def setup(self):
+        if self.data['cat_features']:
+            raise ValueError("%s cannot convert models with categorical splits" % self.name)
+        self.booster = self.shared.get(self.source.shared_key)
+        if self.booster is None:
+            print("%s: training %s model first (untimed)" % (self.name, self.source.name))
+            source = self.source(self.data, self.n_iter, self.preset, self.shared, self.n_threads)
+            source.setup()
+            source.construct()
+            source.fit()
+            self.booster = source.model
+
+    def phases(self):
+        return [("conversion", self.convert), ("predict", self.predict)]
+
+
+class DaalBackend(ConvertedBackend):
+    """Converts the booster of `source` to daal4py and times daal4py prediction."""
+
+    def setup(self):
+        import daal4py as d4p  # keep the import out of the timed conversion
+        if self.n_threads:
+            d4p.daalinit(nthreads=self.n_threads)
+        ConvertedBackend.setup(self)
+        self.n_classes = self.data['n_classes']
+        self.fptype = 'double' if self.data['x_test'].dtype == np.float64 else 'float'
+
+    def predict(self):
+        import daal4py as d4p
+        self.prediction = d4p.gbt_classification_prediction(
+            nClasses=self.n_classes, resultsToEvaluate="computeClassLabels",
+            fptype=self.fptype).compute(self.data['x_test'], self.daal_model).prediction
+
+
+@register_backend("xgb-daal")
+class XGBDaal(DaalBackend):
+    source = XGBStock
+
+    def convert(self):
+        import daal4py as d4p
+        self.daal_model = d4p.get_gbt_model_from_xgboost(self.booster)
+
+
+@register_backend("lgb-daal")
+class LGBDaal(DaalBackend):
+    source = LGBStock
+
+    def convert(self):
+        import daal4py as d4p
+        self.daal_model = d4p.get_gbt_model_from_lightgbm(self.booster)
+
+
+class NumpyBackend(ConvertedBackend):
+    """Compiles the booster of `source` into numpy_forest node tables and predicts with NumPy only."""
+
+    def setup(self):
+        import numpy_forest  # keep the import out of the timed conversion
+        ConvertedBackend.setup(self)
+
+    def predict(self):
+        x = self.data['x_test']
+        self.prediction = self.forest.predict(x.toarray() if hasattr(x, 'toarray') else x)
+
+
+@register_backend("xgb-numpy")
+class XGBNumpy(NumpyBackend):
+    source = XGBStock
+
+    def convert(self):
+        from numpy_forest import NumpyForest
+        self.forest = NumpyForest.from_xgboost(self.booster)
+
+
+@register_backend("lgb-numpy")
+class LGBNumpy(NumpyBackend):
+    source = LGBStock
+
+    def convert(self):
+        from numpy_forest import NumpyForest
+        self.forest = NumpyForest.from_lightgbm(self.booster)
@@ -0,0 +1,260 @@
+import argparse
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory, resource_tracker
+from bench_utils import *
+from backends import BACKENDS
+
+N_PERF_RUNS = 5
+DTYPE=np.float32
+
+
+def load_dataset(dataset, dtype=DTYPE, **loader_args):
+    """Loads a registered data set once into the dict the backends consume."""
+    try:
+        os.mkdir(DATASET_DIR)
+    except:
+        pass
+
+    set_result_context(dataset=dataset, phase="dataset load")
+    x_train, y_train, x_test, y_test, n_classes = DATASETS[dataset](dtype, **loader_args)
+    if isdataframe(x_train):
+        x_train, x_test = x_train.to_numpy(dtype), x_test.to_numpy(dtype)
+    print("n_classes: ", n_classes)
+
+    return {
+        'dataset': dataset,
+        'x_train': x_train, 'y_train': np.asarray(y_train),
+        'x_test': x_test, 'y_test': np.asarray(y_test),
+        'n_classes': n_classes,
+        'cat_features': CATEGORICAL_FEATURES.get(dataset, []),
+    }
+
+
+def share_data(data):
+    """
+    Copies the arrays of `data` into named shared memory blocks, once.
+    Returns the blocks (keep them alive, unlink when done) and a picklable
+    descriptor from which child processes rebuild `data` without copying.
+    Arrays mapped from the data set cache are passed by file name instead.
+    """
+    blocks, desc = [], {}
+    for key, value in data.items():
+        if npy_file(value):
+            desc[key] = ('npy', npy_file(value))
+        elif issparse(value):
+            parts = {}
+            for part in ('data', 'indices', 'indptr'):
+                block, parts[part] = _share_array(getattr(value, part))
+                blocks.append(block)
+            desc[key] = ('csr', parts, value.shape)
+        elif isinstance(value, np.ndarray):
+            block, spec = _share_array(value)
+            blocks.append(block)
+            desc[key] = ('array', spec)
+        else:
+            desc[key] = ('value', value)
+    return blocks, desc
+
+
+def _share_array(array):
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach_block(name):
+    """
+    Opens a block created by share_data without tracking it: the creator
+    unlinks it, and a tracked block would be unlinked with a "leaked
+    shared_memory" warning as soon as the first child exits (Python < 3.13).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # no track argument before Python 3.13
+        # spawned children share the creator's tracker, so unregistering would
+        # drop the creator's entry too; the block is not registered at all instead
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def attach_data(desc):
+    """Rebuilds the data dict from share_data's descriptor. Returns (data, blocks)."""
+    blocks, data = [], {}
+
+    def attach(spec):
+        name, shape, dtype = spec
+        block = _attach_block(name)
+        blocks.append(block)
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+    for key, entry in desc.items():
+        if entry[0] == 'csr':
+            parts, shape = entry[1], entry[2]
+            data[key] = sparse.csr_matrix((attach(parts['data']), attach(parts['indices']),
+                                           attach(parts['indptr'])), shape=shape, copy=False)
+        elif entry[0] == 'array':
+            data[key] = attach(entry[1])
+        elif entry[0] == 'npy':
+            data[key] = np.load(entry[1], mmap_mode='r')
+        else:
+            data[key] = entry[1]
+    return data, blocks
+
+
+def run_backend(name, data, n_runs, n_iter=None, preset=None, shared=None, warmup=None, n_threads=None):
+    """Runs every phase of one backend; returns {phase: seconds}."""
+    backend = BACKENDS[name](data, n_iter=n_iter, preset=preset, shared=shared, n_threads=n_threads)
+    backend.setup()
+    results = {}
+    for phase, func in backend.phases():
+        set_result_context(dataset=data['dataset'], backend=name, phase=phase, n_threads=n_threads)
+        results[phase] = measure(func, "%-10s %-12s" % (name, phase), n_runs, warmup=warmup)
+    return results
+
+
+def _isolated_backend(conn, name, desc, n_runs, n_iter, preset, warmup, settings, n_threads, cpus):
+    apply_measure_settings(settings)
+    if cpus:
+        # before the libraries start their OpenMP pools: one thread per listed core
+        os.sched_setaffinity(0, cpus)
+        os.environ.update(OMP_NUM_THREADS=str(n_threads or len(cpus)), OMP_PROC_BIND='close', OMP_PLACES='cores')
+    data, blocks = attach_data(desc)
+    try:
+        results = run_backend(name, data, n_runs, n_iter, preset, warmup=warmup, n_threads=n_threads)
+        conn.send(('ok', (results, RESULTS)))
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        del data
+        conn.close()
+
+
+def run_isolated(names, data, n_runs, n_iter=None, preset=None, warmup=None, n_threads=None, cpus=None):
+    """Runs each backend in a fresh interpreter attached to one shared copy of the data."""
+    blocks, desc = share_data(data)
+    try:
+        return run_shared(names, desc, n_runs, n_iter, preset, warmup, n_threads, cpus)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def run_shared(names, desc, n_runs, n_iter=None, preset=None, warmup=None, n_threads=None, cpus=None):
+    """
+    run_isolated() against data already shared with share_data(). With
+    `cpus`, each child is pinned to those logical CPUs.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    for name in names:
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=_isolated_backend,
+                           args=(child, name, desc, n_runs, n_iter, preset, warmup,
+                                 measure_settings(), n_threads, cpus))
+        proc.start()
+        child.close()
+        try:
+            status, payload = parent.recv()
+        except EOFError:
+            status, payload = 'error', "process exited with code %s" % proc.exitcode
+        proc.join()
+        if status == 'ok':
+            results[name], records = payload
+            RESULTS.extend(records)
+        else:
+            print("%s failed:\n%s" % (name, payload))
+    return results
+
+
+def run_in_process(names, data, n_runs, n_iter=None, preset=None, warmup=None):
+    shared = {}
+    results = {}
+    for name in names:
+        try:
+            results[name] = run_backend(name, data, n_runs, n_iter, preset, shared, warmup)
+        except Exception:
+            print("%s failed:\n%s" % (name, traceback.format_exc()))
+    return results
+
+
+def print_comparison(results):
+    names = list(results)
+    phases = []
+    for name in names:
+        phases += [phase for phase in results[name] if phase not in phases]
+
+    print("\n%-12s" % "sec" + "".join("%14s" % name for name in names))
+    for phase in phases:
+        cells = ["%14.4f" % results[name][phase] if phase in results[name] else "%14s" % "-"
+                 for name in names]
+        print("%-12s" % phase + "".join(cells))
+
+
+def print_memory(records):
+    """Peak RSS growth of each phase per backend, from the --memory records."""
+    table, names, phases = {}, [], []
+    for record in records:
+        if not record.get('memory'):
+            continue
+        context = record['context']
+        name = context.get('backend', '')
+        phase = context.get('phase', record['label'])
+        if name not in names:
+            names.append(name)
+        if phase not in phases:
+            phases.append(phase)
+        table[name, phase] = record['memory']
+    if not table:
+        return
+
+    print("\n%-12s" % "peak MB" + "".join("%14s" % (name or "(shared)") for name in names))
+    for phase in phases:
+        cells = ["%14s" % ("%.1f/+%.1f" % (table[name, phase]['peak_rss'] / 2**20,
+                                           table[name, phase]['peak_delta'] / 2**20))
+                 if (name, phase) in table else "%14s" % "-" for name in names]
+        print("%-12s" % phase + "".join(cells))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Runs several backends against one loaded data set")
+    parser.add_argument('--dataset', choices=list(DATASETS), metavar='stage', required=True)
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
+    parser.add_argument('--n_iter', default=None, required=False, type=int,
+                        help='boosting rounds [Default=n_estimators of the preset]')
+    parser.add_argument('--preset', default=None, choices=['binary', 'msrank'],
+                        help='parameter preset [Default=by data set]')
+    parser.add_argument('--isolate', action='store_true',
+                        help='run every backend in its own subprocess against shared-memory data')
+    parser.add_argument('--msrank-from-archive', action='store_true',
+                        help='parse MSRank straight from msrank.tar.gz')
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    return args
+
+
+def main():
+    args = parse_args()
+
+    loader_args = {}
+    if args.msrank_from_archive and args.dataset.startswith('msrank'):
+        loader_args['from_archive'] = True
+    data = load_dataset(args.dataset, **loader_args)
+
+    print("Running ...")
+    run = run_isolated if args.isolate else run_in_process
+    results = run(args.backends, data, args.n_runs, args.n_iter, args.preset, args.warmup)
+    print_comparison(results)
+    print_memory(RESULTS)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,50 +9,592 @@ import os
 import re
 import bz2
 import sys
+import json
+import mmap
+import time
 import timeit
+import shutil
+import hashlib
 import tarfile
-import requests
+import inspect
+import threading
+import functools
+import importlib
+import tracemalloc
+import multiprocessing
 import numpy as np
-import pandas as pd
-from sklearn.metrics import log_loss
 
-if sys.version_info[0] >= 3:
-    from urllib.request import urlretrieve  # pylint: disable=import-error,no-name-in-module
-else:
-    from urllib import urlretrieve  # pylint: disable=import-error,no-name-in-module
+
+class _LazyModule(object):
+    """Imports a module on first attribute access, so prediction-only runs never pay for pandas or scipy."""
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+
+pd = _LazyModule('pandas')
+sparse = _LazyModule('scipy.sparse')
 
 DATASET_DIR="./data/"
 
+# Loader outputs are cached as .npy files under DATASET_CACHE_DIR and memory
+# mapped on later runs. BENCH_DATASET_CACHE=0 turns the cache off and
+# BENCH_CACHE_MAX_GB caps its size; least recently used entries go first.
+DATASET_CACHE = os.environ.get("BENCH_DATASET_CACHE", "1") != "0"
+DATASET_CACHE_DIR = DATASET_DIR + "cache/"
+DATASET_CACHE_MAX_BYTES = int(float(os.environ.get("BENCH_CACHE_MAX_GB", "64")) * 2**30)
+_CACHE_VERSION = 1
+_CACHE_FIELDS = ("x_train", "y_train", "x_test", "y_test")
+# BENCH_QUANTIZED_CACHE=1 makes the runner backends train on pre-binned data:
+# LightGBM Datasets are saved with save_binary next to the data set cache
+# and reloaded on later runs, XGBoost uses an in-process QuantileDMatrix.
+QUANTIZED_CACHE = os.environ.get("BENCH_QUANTIZED_CACHE", "0") == "1"
+
+
+# Warmup calls made by measure() before the timed repetitions.
+MEASURE_WARMUP = 0
+
+# With MEASURE_MEMORY, measure() and the data set loaders also record peak
+# RSS and RSS delta per phase; MEMORY_TRACE_ALLOCATIONS adds the largest live
+# NumPy allocations via tracemalloc, which slows the measured code down.
+MEASURE_MEMORY = False
+MEMORY_TRACE_ALLOCATIONS = False
+MEMORY_SAMPLE_INTERVAL = 0.005
+
+# With PROFILE_DIR, measure() runs its timed calls under cProfile, writes
+# <PROFILE_DIR>/<dataset>_<label>.prof and prints the heaviest Python
+# functions. Its records are marked profiled and kept out of the history.
+# The profiler slows Python-heavy code down; compiled kernels run as usual.
+PROFILE_DIR = None
+
+# One record per measure() call: label, context, per-run wall/cpu times and
+# summary statistics. write_results() dumps them as JSON or CSV.
+RESULTS = []
+RESULT_CONTEXT = {'script': os.path.basename(sys.argv[0])}
+
+# Every run also appends its records as JSON lines to HISTORY_FILE, tagged
+# with RUN_ID and the host and CPU model; history.py lists and compares
+# runs. BENCH_HISTORY=0 turns this off, BENCH_HISTORY_FILE moves the file.
+HISTORY = os.environ.get("BENCH_HISTORY", "1") != "0"
+HISTORY_FILE = os.environ.get("BENCH_HISTORY_FILE", DATASET_DIR + "history.jsonl")
+RUN_ID = "%s-%d" % (time.strftime("%Y%m%d-%H%M%S"), os.getpid())
+
+# Two-sided 95% Student t quantiles for 1..30 degrees of freedom.
+_T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def box_filter(timing, left=0.25, right=0.75): # statistically remove outliers and compute average
+    timing = sorted(timing)
+    size = len(timing)
+    if size == 1:
+        return timing[0]
+
+    Q1, Q2 = timing[int(size * left)], timing[int(size * right)]
+
+    IQ = Q2 - Q1
+
+    lower = Q1 - 1.5 * IQ
+    upper = Q2 + 1.5 * IQ
+
+    result = np.array([item for item in timing if lower <= item <= upper])
+    return np.mean(result)
+
+
+def summarize(timing):
+    """Median, p95, IQR-filtered mean and 95% confidence interval of the mean."""
+    timing = np.asarray(timing, dtype=np.float64)
+    n = len(timing)
+    mean = float(np.mean(timing))
+    std = float(np.std(timing, ddof=1)) if n > 1 else 0.0
+    half = float((_T95[n - 2] if n - 1 <= len(_T95) else 1.96) * std / np.sqrt(n)) if n > 1 else 0.0
+    return {
+        'n': n,
+        'mean': mean,
+        'std': std,
+        'median': float(np.median(timing)),
+        'p95': float(np.percentile(timing, 95)),
+        'min': float(np.min(timing)),
+        'max': float(np.max(timing)),
+        'iqr_mean': float(box_filter(timing)),
+        'ci95_low': mean - half,
+        'ci95_high': mean + half,
+    }
+
+
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def page_in(*arrays):
+    """
+    Reads one value per memory page of each array (of each CSR part), so a
+    memory-mapped data set is resident before a memory_phase starts and its
+    page-in does not count as memory of the phase.
+    """
+    for a in arrays:
+        for part in ([a.data, a.indices, a.indptr] if issparse(a) else [a]):
+            flat = np.asarray(part).reshape(-1)
+            flat[::max(1, mmap.PAGESIZE // max(1, flat.itemsize))].sum()
+
+
+def _reset_peak_rss():
+    # writing 5 to clear_refs resets VmHWM, the kernel's exact peak RSS
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except IOError:
+        return False
+
+
+def _peak_rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class MemorySampler(threading.Thread):
+    """Polls RSS in a background thread and keeps the highest value seen."""
+
+    def __init__(self, interval=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = MEMORY_SAMPLE_INTERVAL if interval is None else interval
+        self.peak = current_rss()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return max(self.peak, current_rss())
+
+
+class memory_phase(object):
+    """
+    Context manager recording peak RSS, RSS delta and, when tracing, the
+    largest NumPy allocations still alive at the end of the phase:
+
+        with memory_phase("DMatrix") as mem:
+            ...
+        mem.stats
+    """
+
+    def __init__(self, label, trace=None):
+        self.label = label
+        self.trace = MEMORY_TRACE_ALLOCATIONS if trace is None else trace
+        self.stats = None
+
+    def __enter__(self):
+        if self.trace:
+            tracemalloc.start()
+        self.before = current_rss()
+        self.exact_peak = _reset_peak_rss()
+        self.sampler = MemorySampler()
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        peak = self.sampler.stop()
+        if self.exact_peak:
+            peak = max(peak, _peak_rss())
+        after = current_rss()
+        self.stats = {'rss_before': self.before, 'rss_after': after, 'rss_delta': after - self.before,
+                      'peak_rss': peak, 'peak_delta': peak - self.before}
+        if self.trace:
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.DomainFilter(True, np.lib.tracemalloc_domain)])
+            self.stats['numpy_traced_peak'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.stats['largest_numpy'] = [
+                {'bytes': stat.size, 'count': stat.count, 'where': str(stat.traceback[0])}
+                for stat in snapshot.statistics('lineno')[:5]]
+        return False
+
+    def report(self, indent="    "):
+        st = self.stats
+        print("{}{}: peak RSS {:.1f} MB (+{:.1f} MB), RSS delta {:+.1f} MB".format(
+            indent, self.label, st['peak_rss'] / 2**20, st['peak_delta'] / 2**20, st['rss_delta'] / 2**20))
+        if 'numpy_traced_peak' in st:
+            print("{}    NumPy traced peak {}{}".format(indent, format_bytes(st['numpy_traced_peak']),
+                                                   ", largest still allocated:" if st['largest_numpy'] else ""))
+        for alloc in st.get('largest_numpy', []):
+            print("{}    {:>10} in {:d} block(s) at {}".format(
+                indent, format_bytes(alloc['bytes']), alloc['count'], alloc['where']))
+
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024:
+            return "{:.1f} {}".format(n, unit)
+        n /= 1024.
+    return "{:.2f} GB".format(n)
+
+
+def set_result_context(**context):
+    """Tags the following measure() records, e.g. set_result_context(dataset='higgs1m')."""
+    RESULT_CONTEXT.update(context)
+
+
+def measure(func, string, nrepeat, args=(), kwargs=None, warmup=None):
+    """
+    Calls func(*args, **kwargs) `warmup` times untimed, then `nrepeat` times
+    recording wall and CPU time of each call. Prints a summary, appends a
+    record to RESULTS and returns the IQR-filtered mean wall time.
+    """
+    kwargs = kwargs or {}
+    warmup = MEASURE_WARMUP if warmup is None else warmup
+    for _ in range(warmup):
+        func(*args, **kwargs)
+
+    mem = memory_phase(string.strip()) if MEASURE_MEMORY else None
+    if mem:
+        mem.__enter__()
+    profiler = None
+    if PROFILE_DIR:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    wall, cpu = [], []
+    try:
+        for _ in range(nrepeat):
+            cpu_start = time.process_time()
+            start = timeit.default_timer()
+            func(*args, **kwargs)
+            wall.append(timeit.default_timer() - start)
+            cpu.append(time.process_time() - cpu_start)
+    finally:
+        if profiler:
+            profiler.disable()
+        if mem:
+            mem.__exit__(None, None, None)
+
+    extra = {'python_profile': _save_profile(profiler, string)} if profiler else {}
+    # times under cProfile are inflated: tag them so they never become a baseline
+    stats = _record_result(string, func, wall, cpu, warmup, mem, context={'profiled': True} if profiler else None,
+                           **extra)
+    print((string + " = {:.4f} sec (median {:.4f}, p95 {:.4f}, 95% CI {:.4f}..{:.4f}, cpu {:.4f})").format(
+        stats['iqr_mean'], stats['median'], stats['p95'], stats['ci95_low'], stats['ci95_high'],
+        float(np.median(cpu))), wall)
+    if mem:
+        mem.report()
+    return stats['iqr_mean']
+
+
+def _save_profile(profiler, label, top=8):
+    """Writes a cProfile run to PROFILE_DIR and prints its heaviest functions by cumulative time."""
+    import pstats
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    backend = RESULT_CONTEXT.get('backend', '')
+    label = label.strip() if label.strip().startswith(backend) else "%s %s" % (backend, label.strip())
+    if RESULT_CONTEXT.get('dataset'):
+        label = "%s %s" % (RESULT_CONTEXT['dataset'], label)
+    name = re.sub(r'[^\w.-]+', '_', label).strip('_')
+    path = os.path.join(PROFILE_DIR, name + ".prof")
+    profiler.dump_stats(path)
+    print("Python profile of %s written to %s" % (label.strip(), path))
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
+    return path
+
+
+def latency_summary(latencies, rows_per_call):
+    """Tail percentiles, throughput and a log-spaced histogram (4 bins per decade) of per-call latencies."""
+    latencies = np.asarray(latencies, dtype=np.float64)
+    edges = np.logspace(-7, 1, 33)
+    p50, p90, p99, p999 = np.percentile(latencies, [50, 90, 99, 99.9])
+    return {
+        'n': len(latencies),
+        'rows_per_call': rows_per_call,
+        'p50': float(p50), 'p90': float(p90), 'p99': float(p99), 'p999': float(p999),
+        'mean': float(latencies.mean()),
+        'max': float(latencies.max()),
+        'throughput': rows_per_call * len(latencies) / float(latencies.sum()),
+        'histogram': {'edges': edges.tolist(), 'counts': np.histogram(latencies, edges)[0].tolist()},
+    }
+
+
+def measure_latency(func, string, batches, ncalls, rows_per_call=None, warmup=None):
+    """
+    Times `ncalls` single calls of func(batch), cycling through `batches`
+    (equal-sized, prepared in advance), and records the per-call latency
+    distribution rather than one bulk timing. Returns latency_summary().
+    """
+    warmup = MEASURE_WARMUP if warmup is None else warmup
+    for i in range(warmup):
+        func(batches[i % len(batches)])
+
+    timer = timeit.default_timer
+    wall, cpu = [], []
+    for i in range(ncalls):
+        batch = batches[i % len(batches)]
+        cpu_start = time.process_time()
+        start = timer()
+        func(batch)
+        wall.append(timer() - start)
+        cpu.append(time.process_time() - cpu_start)
+
+    latency = latency_summary(wall, rows_per_call or batches[0].shape[0])
+    _record_result(string, func, wall, cpu, warmup, latency=latency)
+    print((string + " = p50 {:.1f} us, p99 {:.1f} us, p999 {:.1f} us, {:.0f} rows/sec").format(
+        latency['p50'] * 1e6, latency['p99'] * 1e6, latency['p999'] * 1e6, latency['throughput']))
+    return latency
+
+
+def _record_result(string, func, wall, cpu, warmup=0, mem=None, context=None, **extra):
+    stats = summarize(wall)
+    RESULTS.append(dict({
+        'label': string.strip(),
+        'function': getattr(func, '__qualname__', repr(func)),
+        'context': dict(RESULT_CONTEXT, **(context or {})),
+        'warmup': warmup,
+        'wall': wall,
+        'cpu': cpu,
+        'stats': stats,
+        'cpu_stats': summarize(cpu),
+        'memory': mem.stats if mem else None,
+        'versions': library_versions(),
+        'timestamp': time.time(),
+    }, **extra))
+    return stats
+
+
+def environment_info():
+    """Host, CPU and library versions attached to written results."""
+    import platform
+    info = {'host': platform.node(), 'platform': platform.platform(),
+            'python': platform.python_version(), 'n_cpus': os.cpu_count(), 'cpu_model': platform.processor()}
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    info['cpu_model'] = line.split(':', 1)[1].strip()
+                    break
+    except IOError:
+        pass
+    info['versions'] = library_versions()
+    return info
+
+
+_VERSIONS = {}
+
+
+def library_versions():
+    """Versions of the benchmarked libraries imported by this process."""
+    for name in ('numpy', 'pandas', 'xgboost', 'lightgbm', 'daal4py'):
+        if name in sys.modules and name not in _VERSIONS:
+            try:
+                from importlib.metadata import version
+                _VERSIONS[name] = version(name)
+            except Exception:
+                _VERSIONS[name] = str(getattr(sys.modules[name], '__version__', 'unknown'))
+    return dict(_VERSIONS)
+
+
+def write_results(path, records=None):
+    """Writes measure() records as JSON (one object per measurement) or CSV (one row per run)."""
+    records = RESULTS if records is None else records
+    env = environment_info()
+    if path.endswith('.csv'):
+        import csv
+        columns = ['label', 'function', 'run', 'wall', 'cpu', 'warmup', 'timestamp']
+        context_keys = sorted(set(k for r in records for k in r['context']))
+        stat_keys = ['median', 'p95', 'iqr_mean', 'ci95_low', 'ci95_high']
+        memory_keys = ['peak_rss', 'peak_delta', 'rss_delta']
+        env_keys = ['host', 'cpu_model', 'n_cpus']
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns + context_keys + stat_keys + memory_keys + env_keys + ['versions'])
+            for r in records:
+                memory = r.get('memory') or {}
+                for i, (wall, cpu) in enumerate(zip(r['wall'], r['cpu'])):
+                    writer.writerow([r['label'], r['function'], i, wall, cpu, r['warmup'], r['timestamp']] +
+                                    [r['context'].get(k, '') for k in context_keys] +
+                                    [r['stats'][k] for k in stat_keys] +
+                                    [memory.get(k, '') for k in memory_keys] +
+                                    [env[k] for k in env_keys] + [json.dumps(r['versions'])])
+    else:
+        with open(path, 'w') as f:
+            json.dump({'environment': env, 'measurements': records}, f, indent=1)
+    print("Results written to", path)
+
+
+def append_history(records=None, path=None):
+    """
+    Appends records to the history file, one JSON object per line, all under
+    this process's RUN_ID. Records timed under cProfile are left out.
+    """
+    records = RESULTS if records is None else records
+    path = path or HISTORY_FILE
+    profiled = [r for r in records if r['context'].get('profiled')]
+    if profiled:
+        print("%d measurements timed under cProfile left out of the history" % len(profiled))
+        records = [r for r in records if not r['context'].get('profiled')]
+    if not records:
+        return
+    env = environment_info()
+    del env['versions']
+    lines = "".join(json.dumps(dict(r, run=RUN_ID, environment=env)) + "\n" for r in records)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(lines)
+    print("%d measurements of run %s added to %s" % (len(records), RUN_ID, path))
 
-def measure(func, string, nrepeat):
-    t = timeit.Timer(stmt="%s()" % func.__name__, setup="from __main__ import %s" % func.__name__)
-    res = t.repeat(repeat=nrepeat, number=1)
 
-    def box_filter(timing, left=0.25, right=0.75): # statistically remove outliers and compute average
-        timing.sort()
-        size = len(timing)
-        if size == 1:
-            return timing[0]
+def read_history(path=None):
+    """Records of the history file in the order they were written; lines cut off by a crashed run are skipped."""
+    path = path or HISTORY_FILE
+    if not os.path.isfile(path):
+        return []
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
 
-        Q1, Q2 = timing[int(size * left)], timing[int(size * right)]
 
-        IQ = Q2 - Q1
+def add_measure_args(parser):
+    parser.add_argument('--warmup', default=MEASURE_WARMUP, required=False, type=int,
+                        help='untimed calls before each measurement')
+    parser.add_argument('--results', default=None, required=False,
+                        help='write every measured run to this .json or .csv file')
+    parser.add_argument('--memory', action='store_true',
+                        help='record peak RSS and RSS delta of every phase')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='with --memory, also list the largest NumPy allocations (slow)')
+    parser.add_argument('--profile-python', default=None, metavar='DIR',
+                        help='profile the Python side of every measured phase with cProfile into DIR')
+    parser.add_argument('--history', default=None, required=False,
+                        help='append the results to this history file [Default=%s]' % HISTORY_FILE)
+    parser.add_argument('--no-history', action='store_true', help='do not add this run to the history')
 
-        lower = Q1 - 1.5 * IQ
-        upper = Q2 + 1.5 * IQ
 
-        result = np.array([item for item in timing if lower < item < upper])
-        return np.mean(result)
+def apply_measure_args(args):
+    apply_measure_settings({'warmup': args.warmup, 'memory': args.memory,
+                            'trace_allocations': args.trace_allocations, 'profile_dir': args.profile_python})
+    import atexit
+    if args.results:
+        atexit.register(write_results, args.results)
+    if HISTORY and not args.no_history:
+        atexit.register(append_history, None, args.history)
 
-    timing = box_filter(res)
-    print((string + " = {:.4f} sec (").format(timing), res, ")")
+
+def measure_settings():
+    """Current measure() configuration, to hand over to worker processes."""
+    return {'warmup': MEASURE_WARMUP, 'memory': MEASURE_MEMORY,
+            'trace_allocations': MEMORY_TRACE_ALLOCATIONS, 'profile_dir': PROFILE_DIR}
+
+
+def apply_measure_settings(settings):
+    global MEASURE_WARMUP, MEASURE_MEMORY, MEMORY_TRACE_ALLOCATIONS, PROFILE_DIR
+    MEASURE_WARMUP = settings['warmup']
+    MEASURE_MEMORY = settings['memory']
+    MEMORY_TRACE_ALLOCATIONS = settings['trace_allocations']
+    PROFILE_DIR = settings.get('profile_dir')
+
+
+def physical_cores():
+    """
+    One logical CPU per physical core this process may run on, ordered by
+    socket and core, so pinning the first n keeps threads off hyperthread
+    siblings and on as few sockets as possible.
+    """
+    allowed = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count()))
+    cores = {}
+    for cpu in allowed:
+        topology = '/sys/devices/system/cpu/cpu%d/topology/' % cpu
+        try:
+            with open(topology + 'physical_package_id') as f:
+                package = int(f.read())
+            with open(topology + 'core_id') as f:
+                core = int(f.read())
+        except (IOError, ValueError):
+            package, core = 0, cpu
+        cores.setdefault((package, core), cpu)
+    return [cores[key] for key in sorted(cores)]
+
+
+def _parse_cpulist(text):
+    cpus = []
+    for part in filter(None, text.strip().split(',')):
+        first, _, last = part.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def numa_nodes():
+    """Logical CPUs this process may run on, grouped by NUMA node; one group if the topology is unknown."""
+    allowed = set(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else set(range(os.cpu_count()))
+    nodes = []
+    base = '/sys/devices/system/node/'
+    names = sorted((n for n in os.listdir(base) if re.match(r'node\d+$', n)), key=lambda n: int(n[4:])) \
+        if os.path.isdir(base) else []
+    for name in names:
+        with open(base + name + '/cpulist') as f:
+            cpus = [cpu for cpu in _parse_cpulist(f.read()) if cpu in allowed]
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [sorted(allowed)]
+
+
+def print_break_even(convert_time, stock_predict_time, daal_predict_time):
+    """How many test-set predictions it takes to win back the daal4py conversion."""
+    saved = stock_predict_time - daal_predict_time
+    if saved <= 0:
+        print("Daal predict is not faster than stock predict; conversion never pays off")
+    else:
+        print("Daal conversion pays off after {:.1f} test-set predictions per trained model".format(
+            convert_time / saved))
+
+
+def print_parity(name, prediction, reference, atol=1e-5):
+    """Compares an alternative predictor's output with the library's own predict."""
+    diff = float(np.max(np.abs(np.asarray(prediction, dtype=np.float64) - reference))) if len(reference) else 0.0
+    print("{} vs stock predict: max abs diff {:.3g} ({})".format(name, diff, "OK" if diff <= atol else "MISMATCH"))
+    return diff <= atol
+
+
+def issparse(x):
+    """sparse.issparse without importing scipy: nothing is a scipy matrix before scipy.sparse is loaded."""
+    return 'scipy.sparse' in sys.modules and sparse.issparse(x)
+
+
+def isdataframe(x):
+    return 'pandas' in sys.modules and isinstance(x, (pd.DataFrame, pd.Series))
 
 
 def compute_logloss(y1, y2):
+    from sklearn.metrics import log_loss
     return log_loss(y1.ravel(), y2)
 
 
+def time_to_target(curve, target):
+    """First (round, seconds) of a [(round, seconds, loss)] curve with loss <= target, or None."""
+    for iteration, seconds, loss in curve:
+        if loss <= target:
+            return iteration, seconds
+    return None
+
+
 def download_file(url):
+    import requests
     local_filename = DATASET_DIR + url.split('/')[-1]
     with requests.get(url, stream=True) as r:
         r.raise_for_status()
@@ -63,6 +605,400 @@ def download_file(url):
     return local_filename
 
 
+def _source_fingerprint(sources):
+    fingerprint = {}
+    for name in sources:
+        path = os.path.join(DATASET_DIR, name)
+        if os.path.exists(path):
+            st = os.stat(path)
+            fingerprint[name] = [st.st_size, st.st_mtime_ns]
+    return fingerprint
+
+
+def _cache_entry_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def evict_dataset_cache(max_bytes=None, keep=()):
+    """Removes least recently used cache entries until the cache fits max_bytes."""
+    max_bytes = DATASET_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(DATASET_CACHE_DIR):
+        return
+    entries = []
+    for name in os.listdir(DATASET_CACHE_DIR):
+        path = os.path.join(DATASET_CACHE_DIR, name)
+        meta = os.path.join(path, "meta.json")
+        if os.path.isfile(meta):
+            entries.append((os.path.getmtime(meta), _cache_entry_size(path), path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if os.path.basename(path) in keep:
+            continue
+        print("Evicting cached data set", path)
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+    if total > max_bytes:
+        print("Warning: data set cache holds {:.1f} GB, above the {:.1f} GB cap".format(
+            total / 2**30, max_bytes / 2**30))
+
+
+def _load_cache_entry(path, meta):
+    arrays = []
+    for field in _CACHE_FIELDS:
+        if field in meta.get("sparse", {}):
+            parts = [np.load(os.path.join(path, "%s.%s.npy" % (field, part)), mmap_mode='r')
+                     for part in ("data", "indices", "indptr")]
+            arrays.append(sparse.csr_matrix(tuple(parts), shape=tuple(meta["sparse"][field]), copy=False))
+        else:
+            arrays.append(np.load(os.path.join(path, field + ".npy"), mmap_mode='r'))
+    return arrays[0], arrays[1], arrays[2], arrays[3], meta["n_classes"]
+
+
+def _as_arrays(result, dtype):
+    """A loader result with DataFrames and Series as C-contiguous ndarrays and sparse matrices as CSR."""
+    arrays = []
+    for value in result[:4]:
+        if issparse(value):
+            arrays.append(value.tocsr())
+            continue
+        if isdataframe(value):
+            value = value.to_numpy(dtype=dtype if value.ndim == 2 else None)
+        arrays.append(np.ascontiguousarray(value))
+    return arrays[0], arrays[1], arrays[2], arrays[3], result[4]
+
+
+def _store_cache_entry(path, result, meta, dtype):
+    tmp = "%s.tmp-%d" % (path, os.getpid())
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    meta["sparse"] = {}
+    for field, value in zip(_CACHE_FIELDS, _as_arrays(result, dtype)[:4]):
+        if issparse(value):
+            for part in ("data", "indices", "indptr"):
+                np.save(os.path.join(tmp, "%s.%s.npy" % (field, part)), getattr(value, part))
+            meta["sparse"][field] = list(value.shape)
+            continue
+        np.save(os.path.join(tmp, field + ".npy"), value)
+    meta["n_classes"] = int(result[4])
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+
+    shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp, path)
+    except OSError:  # another process stored the same entry first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def dataset_cache(*sources, ignore=()):
+    """
+    Caches a loader's (x_train, y_train, x_test, y_test, n_classes) result.
+    The key covers the loader name and its bound arguments (row counts,
+    dtype); an entry is rebuilt when one of the `sources` files under
+    DATASET_DIR changes size or mtime. Arguments named in `ignore` (e.g.
+    worker counts) do not affect the result and are left out of the key.
+    Hits are returned as read-only memory maps and misses are stored first,
+    so both return the same types; with the cache off DataFrames are still
+    converted to ndarrays, so no code path depends on the cache setting.
+    """
+    def decorator(loader):
+        signature = inspect.signature(loader)
+
+        def cached_loader(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if not DATASET_CACHE:
+                return _as_arrays(loader(*args, **kwargs), bound.arguments.get("dtype"))
+
+            params = dict((k, np.dtype(v).name if k == "dtype" else v)
+                          for k, v in bound.arguments.items() if k not in ignore)
+            key_src = json.dumps([_CACHE_VERSION, loader.__name__, params], sort_keys=True)
+            key = "%s-%s" % (loader.__name__, hashlib.sha1(key_src.encode()).hexdigest()[:12])
+            path = os.path.join(DATASET_CACHE_DIR, key)
+            meta_file = os.path.join(path, "meta.json")
+
+            if os.path.isfile(meta_file):
+                with open(meta_file) as f:
+                    meta = json.load(f)
+                current = _source_fingerprint(sources)
+                stale = any(meta["sources"].get(name) != fp for name, fp in current.items())
+                if not stale:
+                    print("Reading cached data set", path)
+                    os.utime(meta_file)
+                    return _load_cache_entry(path, meta)
+                print("Source changed, rebuilding cached data set", path)
+
+            result = loader(*args, **kwargs)
+            meta = {"version": _CACHE_VERSION, "loader": loader.__name__, "params": params,
+                    "sources": _source_fingerprint(sources), "created": time.time()}
+            print("Caching data set to", path)
+            _store_cache_entry(path, result, meta, bound.arguments.get("dtype"))
+            evict_dataset_cache(keep=(key,))
+            return _load_cache_entry(path, meta)
+
+        wrapper = functools.wraps(loader)(measured_load(cached_loader, loader))
+        wrapper.uncached = loader
+        return wrapper
+    return decorator
+
+
+def measured_load(func, loader=None):
+    """With MEASURE_MEMORY, calls of `func` are recorded as a "dataset load" phase with time and peak memory."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not MEASURE_MEMORY:
+            return func(*args, **kwargs)
+        with memory_phase("dataset load") as mem:
+            cpu_start, start = time.process_time(), timeit.default_timer()
+            result = func(*args, **kwargs)
+            wall, cpu = timeit.default_timer() - start, time.process_time() - cpu_start
+        _record_result("dataset load", loader or func, [wall], [cpu], mem=mem)
+        print("Data set load = {:.4f} sec".format(wall))
+        mem.report()
+        return result
+    return wrapper
+
+
+def _read_npy_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(f)
+    return np.lib.format.read_array_header_2_0(f)
+
+
+def npy_file(x):
+    """Path of the .npy file that `x` maps as a whole (as the data set cache returns it), else None."""
+    filename = getattr(x, 'filename', None)
+    if not isinstance(x, np.memmap) or not filename or not os.path.isfile(filename):
+        return None
+    with open(filename, 'rb') as f:
+        shape, fortran_order, dtype = _read_npy_header(f)
+        offset = f.tell()
+    # slices of a memmap keep the parent's filename and offset
+    if shape != x.shape or dtype != x.dtype or fortran_order or offset != x.offset:
+        return None
+    return filename
+
+
+class NpyRows(object):
+    """Row ranges of a C-ordered .npy file, read into fresh arrays instead of mapping the file."""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb', buffering=0)
+        self.shape, _, self.dtype = _read_npy_header(self.file)
+        self.offset = self.file.tell()
+        self.row_bytes = self.dtype.itemsize * int(np.prod(self.shape[1:]))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def read(self, start, stop):
+        stop = min(stop, self.shape[0])
+        rows = np.empty((max(0, stop - start),) + tuple(self.shape[1:]), dtype=self.dtype)
+        self.file.seek(self.offset + start * self.row_bytes)
+        view, done = memoryview(rows).cast('B'), 0
+        # raw reads may return fewer bytes than asked for
+        while done < len(view):
+            n = self.file.readinto(view[done:])
+            if not n:
+                raise IOError("%s ends inside rows %d..%d" % (self.file.name, start, stop))
+            done += n
+        return rows
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# LightGBM parameters that change how features are binned into a Dataset.
+_LGB_BINNING_PARAMS = ("max_bin", "max_bin_by_feature", "min_data_in_bin", "bin_construct_sample_cnt",
+                       "data_random_seed", "use_missing", "zero_as_missing", "feature_pre_filter",
+                       "min_data_in_leaf", "min_child_samples", "enable_bundle", "linear_tree")
+
+
+# bytes hashed per update, so a non-contiguous array is copied a block at a time
+_DIGEST_BLOCK_BYTES = 64 * 2**20
+
+
+def _data_digest(*arrays):
+    """
+    Hash of the shapes and every element of each array. A sample would miss
+    edits to rows outside it and reuse a stale binned Dataset; hashing a
+    memory-mapped cache file is still far cheaper than binning it again.
+    """
+    h = hashlib.sha1()
+    for a in arrays:
+        if issparse(a):
+            a = a.tocsr()
+            h.update(repr((a.shape, a.nnz, a.dtype.str)).encode())
+            parts = [a.data, a.indices, a.indptr]
+        else:
+            a = np.asarray(a)
+            h.update(repr((a.shape, a.dtype.str)).encode())
+            parts = [a]
+        for part in parts:
+            step = max(1, _DIGEST_BLOCK_BYTES // max(1, part[:1].nbytes))
+            for start in range(0, len(part), step):
+                h.update(np.ascontiguousarray(part[start:start + step]))
+    return h.hexdigest()
+
+
+def lgb_quantized_path(dataset, x, y, params, categorical_feature='auto'):
+    binning = dict((k, params[k]) for k in _LGB_BINNING_PARAMS if k in params)
+    key_src = json.dumps([_CACHE_VERSION, binning, categorical_feature, _data_digest(x, y)], sort_keys=True)
+    key = "quantized-lgb-%s-%s-bin%s-%s" % (dataset, np.dtype(x.dtype).name, params.get("max_bin", 255),
+                                            hashlib.sha1(key_src.encode()).hexdigest()[:12])
+    return os.path.join(DATASET_CACHE_DIR, key)
+
+
+def lgb_quantized_dataset(dataset, x, y, params, categorical_feature='auto'):
+    """
+    Returns a constructed lgb.Dataset, loaded from the binary file an earlier
+    run saved with save_binary when dataset, dtype, binning parameters and
+    data match. Entries live in DATASET_CACHE_DIR and share its size cap.
+    """
+    import lightgbm as lgb
+    path = lgb_quantized_path(dataset, x, y, params, categorical_feature)
+    meta_file = os.path.join(path, "meta.json")
+    if os.path.isfile(meta_file):
+        print("Reading quantized data set", path)
+        os.utime(meta_file)
+        return lgb.Dataset(os.path.join(path, "train.bin"), params=params).construct()
+
+    train = lgb.Dataset(x, y, params=params, categorical_feature=categorical_feature,
+                        free_raw_data=False).construct()
+    print("Saving quantized data set to", path)
+    tmp = "%s.tmp-%d" % (path, os.getpid())
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    train.save_binary(os.path.join(tmp, "train.bin"))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"version": _CACHE_VERSION, "dataset": dataset, "params": params,
+                   "created": time.time()}, f, indent=1)
+    shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    evict_dataset_cache(keep=(os.path.basename(path),))
+    return train
+
+
+# Trained boosters and their daal4py conversions, one directory per booster
+# content hash, plus <name>.json pointers to the latest model of a script.
+MODEL_CACHE_DIR = DATASET_DIR + "models/"
+
+
+def _model_library(booster):
+    return 'xgb' if hasattr(booster, 'save_raw') else 'lgb'
+
+
+def model_key(booster):
+    """Content hash of a trained booster; take it before converting, the conversion sets XGBoost feature names."""
+    if _model_library(booster) == 'xgb':
+        raw = bytes(booster.save_raw('ubj'))
+    else:
+        raw = booster.model_to_string().encode()
+    return "%s-%s" % (_model_library(booster), hashlib.sha1(raw).hexdigest()[:16])
+
+
+def save_models(booster, name=None, key=None, **meta):
+    """
+    Stores the booster under MODEL_CACHE_DIR/<model_key>/ (call it before
+    converting an XGBoost booster). With `name`, <name>.json is pointed at
+    this entry so prediction-only runs find it. Returns the key.
+    """
+    key = key or model_key(booster)
+    path = os.path.join(MODEL_CACHE_DIR, key)
+    os.makedirs(path, exist_ok=True)
+    if _model_library(booster) == 'xgb':
+        booster.save_model(os.path.join(path, "booster.ubj"))
+    else:
+        booster.save_model(os.path.join(path, "booster.txt"))
+    meta = dict(meta, key=key, library=_model_library(booster), created=time.time())
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    if name:
+        with open(os.path.join(MODEL_CACHE_DIR, name + ".json"), "w") as f:
+            json.dump({"key": key}, f)
+    print("Saved model", path)
+    return key
+
+
+def save_daal_model(key, daal_model):
+    """Adds the daal4py conversion to the entry save_models() created for its booster."""
+    import pickle
+    path = os.path.join(MODEL_CACHE_DIR, key)
+    with open(os.path.join(path, "daal.pkl.tmp"), "wb") as f:
+        pickle.dump(daal_model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(os.path.join(path, "daal.pkl.tmp"), os.path.join(path, "daal.pkl"))
+
+
+def model_entry(name_or_key):
+    """(directory, meta) of a model saved by save_models, by pointer name or key, without loading it."""
+    pointer = os.path.join(MODEL_CACHE_DIR, name_or_key + ".json")
+    key = name_or_key
+    if os.path.isfile(pointer):
+        with open(pointer) as f:
+            key = json.load(f)["key"]
+    path = os.path.join(MODEL_CACHE_DIR, key)
+    if not os.path.isfile(os.path.join(path, "meta.json")):
+        raise ValueError("no saved model %r under %s" % (name_or_key, MODEL_CACHE_DIR))
+    with open(os.path.join(path, "meta.json")) as f:
+        return path, json.load(f)
+
+
+def load_models(name_or_key):
+    """Loads (booster, daal_model or None, meta) saved by save_models, by pointer name or key."""
+    import pickle
+    path, meta = model_entry(name_or_key)
+    if meta["library"] == 'xgb':
+        import xgboost as xgb
+        booster = xgb.Booster(model_file=os.path.join(path, "booster.ubj"))
+    else:
+        import lightgbm as lgb
+        booster = lgb.Booster(model_file=os.path.join(path, "booster.txt"))
+    daal_model = None
+    if os.path.isfile(os.path.join(path, "daal.pkl")):
+        import daal4py
+        with open(os.path.join(path, "daal.pkl"), "rb") as f:
+            daal_model = pickle.load(f)
+    print("Loaded model", path)
+    return booster, daal_model, meta
+
+
+def cached_daal_model(booster, **meta):
+    """
+    daal4py conversion of `booster`, reused from MODEL_CACHE_DIR when this
+    exact booster was converted before. XGBoost boosters are converted as a
+    copy, so the caller's booster keeps working with unnamed DMatrix input.
+    """
+    key = model_key(booster)
+    if os.path.isfile(os.path.join(MODEL_CACHE_DIR, key, "daal.pkl")):
+        return load_models(key)[1]
+    import daal4py as d4p
+    save_models(booster, key=key, **meta)
+    if _model_library(booster) == 'xgb':
+        daal_model = d4p.get_gbt_model_from_xgboost(booster.copy())
+    else:
+        daal_model = d4p.get_gbt_model_from_lightgbm(booster)
+    save_daal_model(key, daal_model)
+    return daal_model
+
+
+# Rows per pandas chunk when streaming HIGGS: ~30 MB of float32 per chunk.
+HIGGS_CHUNK_ROWS = 2**18
+
+
+@dataset_cache("HIGGS.csv.gz")
 def load_higgs(nrows_train, nrows_test, dtype):
     """
     Higgs dataset from UCI machine learning repository (
@@ -76,15 +1012,38 @@ def load_higgs(nrows_train, nrows_test, dtype):
         download_file("https://archive.ics.uci.edu/ml/machine-learning-databases/00280/HIGGS.csv.gz")
 
     print("Reading data set...")
-    data = pd.read_csv(DATASET_DIR + "HIGGS.csv.gz", delimiter=",", header=None, compression="gzip", dtype=dtype, nrows=nrows_train+nrows_test)
-    print("Pre-processing data set...")
-
-    data = data[list(data.columns[1:])+list(data.columns[0:1])]
-    n_features = data.shape[1]-1
-    train_data = np.ascontiguousarray(data.values[:nrows_train,:n_features], dtype=dtype)
-    train_label = np.ascontiguousarray(data.values[:nrows_train,n_features], dtype=dtype)
-    test_data = np.ascontiguousarray(data.values[nrows_train:nrows_train+nrows_test,:n_features], dtype=dtype)
-    test_label = np.ascontiguousarray(data.values[nrows_train:nrows_train+nrows_test,n_features], dtype=dtype)
+    n_features = 28
+    train_data = np.empty((nrows_train, n_features), dtype=dtype)
+    train_label = np.empty((nrows_train,), dtype=dtype)
+    test_data = np.empty((nrows_test, n_features), dtype=dtype)
+    test_label = np.empty((nrows_test,), dtype=dtype)
+
+    # Column 0 is the label. Each chunk is scattered straight into the
+    # preallocated outputs, so peak memory is the outputs plus one chunk.
+    reader = pd.read_csv(DATASET_DIR + "HIGGS.csv.gz", delimiter=",", header=None, compression="gzip",
+                         dtype=dtype, nrows=nrows_train+nrows_test, chunksize=HIGGS_CHUNK_ROWS)
+    row = 0
+    for chunk in reader:
+        block = chunk.to_numpy()
+        n = block.shape[0]
+        n_train = min(max(nrows_train - row, 0), n)
+        if n_train:
+            train_data[row:row+n_train] = block[:n_train, 1:]
+            train_label[row:row+n_train] = block[:n_train, 0]
+        if n_train < n:
+            start = row + n_train - nrows_train
+            test_data[start:start+n-n_train] = block[n_train:, 1:]
+            test_label[start:start+n-n_train] = block[n_train:, 0]
+        row += n
+
+    if row < nrows_train + nrows_test:
+        print("Warning: HIGGS.csv.gz has only %d rows" % row)
+        n_train, n_test = min(row, nrows_train), max(row - nrows_train, 0)
+        train_data.resize((n_train, n_features), refcheck=False)
+        train_label.resize((n_train,), refcheck=False)
+        test_data.resize((n_test, n_features), refcheck=False)
+        test_label.resize((n_test,), refcheck=False)
+
     n_classes = len(np.unique(train_label))
     return train_data, train_label, test_data, test_label, n_classes
 
@@ -93,7 +1052,289 @@ def load_higgs1m(dtype):
     return load_higgs(1000000, 500000, dtype)
 
 
-def read_libsvm_msrank(file_obj, n_samples, n_features, dtype):
+def load_higgs_full(dtype):
+    # the last 500k rows are the test set suggested by the UCI description
+    return load_higgs(10500000, 500000, dtype)
+
+
+# Bytes per read for the chunked LibSVM parser: large enough to amortise the
+# per-chunk NumPy calls, small enough that the token list stays ~100 MB.
+LIBSVM_CHUNK_SIZE = 8 * 2**20
+
+_LIBSVM_BLANK_LINES = re.compile(rb'(?m)^[ \t\r]*\n')
+
+
+def _has_blank_lines(block):
+    """Cheap test whether _LIBSVM_BLANK_LINES can match in a block that starts on a line start."""
+    return (b'\n\n' in block or b'\n ' in block or b'\n\t' in block or b'\n\r' in block
+            or block[:1].isspace())
+
+
+def _parse_libsvm_block(block, n_features):
+    """
+    Parse a block of complete LibSVM lines in one shot.
+    Every line is rewritten as "-1:<label> 0:<qid> <idx>:<value> ...", so the
+    whole block becomes a flat sequence of (index, value) pairs and row
+    boundaries are simply the pairs with index -1.
+    Returns (labels, rows, cols, values) with rows relative to the block.
+    """
+    block = block.replace(b'\r', b'')
+    if _has_blank_lines(block):
+        block = _LIBSVM_BLANK_LINES.sub(b'', block)
+    block = block.rstrip()
+    if not block:
+        empty = np.empty(0)
+        return empty, np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), empty
+
+    block = b'-1:' + block.replace(b'qid:', b'0:').replace(b'\n', b'\n-1:')
+    n_pairs = block.count(b':')
+    pairs = np.fromstring(block.replace(b':', b' '), dtype=np.float64, sep=' ')
+    if pairs.size != 2 * n_pairs:
+        raise ValueError("Malformed LibSVM data: expected %d index:value pairs" % n_pairs)
+    pairs = pairs.reshape(-1, 2)
+
+    index = pairs[:, 0].astype(np.intp)
+    starts = index == -1
+    rows = np.cumsum(starts) - 1
+    features = ~starts
+    cols = index[features]
+    if cols.size and (cols.min() < 0 or cols.max() >= n_features):
+        raise ValueError("LibSVM feature index out of range [0, %d)" % n_features)
+
+    return pairs[starts, 1], rows[features], cols, pairs[features, 1]
+
+
+class LibSVMBuilder(object):
+    """
+    Incremental LibSVM parser. Bytes are fed in arbitrary pieces and parsed
+    one block of complete lines at a time straight into a growable X/y pair
+    of the requested dtype. Feature indices absent from a line keep `missing`.
+    With `out=(X, y)` rows are written into those fixed-size arrays instead.
+    """
+
+    def __init__(self, n_features, dtype, capacity=0, missing=0.0, max_rows=None, out=None):
+        self.n_features = n_features
+        self.missing = missing
+        self.max_rows = max_rows
+        self.n_rows = 0
+        self._tail = b''
+        self._fixed = out is not None
+        if self._fixed:
+            self.X, self.y = out
+            if missing != 0:
+                self.X[...] = missing
+        else:
+            self.X = np.empty((0, n_features), dtype=dtype)
+            self.y = np.empty((0,), dtype=dtype)
+        self.reserve(capacity)
+
+    def reserve(self, capacity):
+        old = self.X.shape[0]
+        if capacity <= old:
+            return
+        if self._fixed:
+            raise ValueError("LibSVM data has more rows than the output buffer (%d)" % old)
+        # resize() reallocs in place; C order keeps the filled rows intact
+        self.X.resize((capacity, self.n_features), refcheck=False)
+        self.y.resize((capacity,), refcheck=False)
+        if self.missing != 0:
+            self.X[old:] = self.missing
+
+    def full(self):
+        return self.max_rows is not None and self.n_rows >= self.max_rows
+
+    def feed(self, data):
+        if self.full():
+            return
+        end = data.rfind(b'\n')
+        if end == -1:
+            self._tail += data
+            return
+        block = self._tail + data[:end]
+        self._tail = data[end + 1:]
+        self._append(block)
+
+    def _append(self, block):
+        labels, rows, cols, values = _parse_libsvm_block(block, self.n_features)
+        n = len(labels)
+        if self.max_rows is not None and self.n_rows + n > self.max_rows:
+            n = self.max_rows - self.n_rows
+            keep = rows < n
+            labels, rows, cols, values = labels[:n], rows[keep], cols[keep], values[keep]
+        if self.n_rows + n > self.X.shape[0]:
+            self.reserve(max(self.n_rows + n, 2 * self.X.shape[0]))
+
+        self.X[self.n_rows + rows, cols] = values
+        self.y[self.n_rows:self.n_rows + n] = labels
+        self.n_rows += n
+
+    def flush(self):
+        """Parses a last line that has no trailing newline."""
+        if self._tail and not self.full():
+            self._append(self._tail)
+        self._tail = b''
+
+    def finish(self):
+        self.flush()
+        if self._fixed:
+            return self.X[:self.n_rows], self.y[:self.n_rows]
+        self.X.resize((self.n_rows, self.n_features), refcheck=False)
+        self.y.resize((self.n_rows,), refcheck=False)
+        return self.X, self.y
+
+
+def read_libsvm_msrank(file_obj, n_samples, n_features, dtype, missing=0.0):
+    """
+    Single-pass chunked LibSVM reader. `n_samples` caps the number of rows
+    read; pass None to read the whole file, the buffer grows as needed and
+    is pre-sized from the file size when it can be determined.
+    The qid is stored as feature 0, as the regex parser did.
+    """
+    file_obj = getattr(file_obj, 'buffer', file_obj)  # text-mode files
+    builder = LibSVMBuilder(n_features, dtype, capacity=n_samples or 0,
+                            missing=missing, max_rows=n_samples)
+    try:
+        size = os.fstat(file_obj.fileno()).st_size - file_obj.tell()
+    except (AttributeError, OSError, ValueError):
+        size = None
+
+    _feed_libsvm(builder, file_obj, size if n_samples is None else None)
+    return builder.finish()
+
+
+def _feed_libsvm(builder, file_obj, size=None):
+    """Feeds a binary stream to `builder`, pre-sizing it from the stream size."""
+    rows_before = builder.n_rows
+    first = True
+    for chunk in _make_gen(file_obj.read, LIBSVM_CHUNK_SIZE):
+        builder.feed(chunk)
+        if first and size and builder.n_rows > rows_before:
+            rows = (builder.n_rows - rows_before) * size / len(chunk)
+            builder.reserve(rows_before + int(rows * 1.02) + 1)
+        first = False
+        if builder.full():
+            break
+
+
+# Output buffers of read_libsvm_files_parallel, inherited by forked workers.
+_LIBSVM_OUTPUTS = {}
+
+
+def _read_byte_range(filename, start, end):
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(LIBSVM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _split_line_ranges(filename, piece_size):
+    """Splits a file into (start, end) byte ranges that begin on line starts."""
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, 'rb') as f:
+        pos = piece_size
+        while pos < size:
+            f.seek(pos - 1)
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+            pos += piece_size
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _count_libsvm_rows(task):
+    """Rows in a byte range as _parse_libsvm_block counts them: lines with anything but spaces, tabs and CR."""
+    filename, start, end = task
+    n_rows, tail = 0, b''
+    for chunk in _read_byte_range(filename, start, end):
+        chunk = tail + chunk
+        cut = chunk.rfind(b'\n') + 1
+        lines, tail = chunk[:cut], chunk[cut:]
+        n_rows += lines.count(b'\n')
+        if _has_blank_lines(lines):
+            n_rows -= len(_LIBSVM_BLANK_LINES.findall(lines))
+    if tail.strip():
+        n_rows += 1
+    return n_rows
+
+
+def _parse_libsvm_range(task):
+    out, row0, n_rows, filename, start, end, missing = task
+    X, y = _LIBSVM_OUTPUTS[out]
+    builder = LibSVMBuilder(X.shape[1], X.dtype, missing=missing,
+                            out=(X[row0:row0+n_rows], y[row0:row0+n_rows]))
+    for chunk in _read_byte_range(filename, start, end):
+        builder.feed(chunk)
+    builder.finish()
+    if builder.n_rows != n_rows:
+        raise ValueError("%s[%d:%d]: parsed %d rows, counted %d" %
+                         (filename, start, end, builder.n_rows, n_rows))
+
+
+def _shared_array(shape, dtype):
+    # anonymous MAP_SHARED memory: writes from forked workers are visible here
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    buf = mmap.mmap(-1, max(nbytes, 1))
+    return np.frombuffer(buf, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def read_libsvm_files_parallel(groups, n_features, dtype, n_jobs=None, missing=0.0):
+    """
+    Parses LibSVM files in a process pool. `groups` is a list of file lists;
+    the files of one group are stacked, in order, into a single (X, y) pair.
+    Every file is cut into byte ranges on line boundaries; a first pass
+    counts the rows of each range, then each range is parsed straight into
+    its slice of a shared preallocated output, so there is no stacking copy.
+    """
+    if n_jobs is None:
+        n_jobs = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    total_size = sum(os.path.getsize(f) for group in groups for f in group)
+    piece_size = max(LIBSVM_CHUNK_SIZE, total_size // (4 * n_jobs) + 1)
+
+    ranges = []
+    for out, group in enumerate(groups):
+        for filename in group:
+            ranges += [(out, filename, start, end)
+                       for start, end in _split_line_ranges(filename, piece_size)]
+
+    use_pool = n_jobs > 1 and len(ranges) > 1 and 'fork' in multiprocessing.get_all_start_methods()
+    if use_pool:
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(min(n_jobs, len(ranges))) as pool:
+            counts = pool.map(_count_libsvm_rows, [r[1:] for r in ranges])
+    else:
+        counts = [_count_libsvm_rows(r[1:]) for r in ranges]
+
+    tasks, totals = [], [0] * len(groups)
+    for (out, filename, start, end), n_rows in zip(ranges, counts):
+        tasks.append((out, totals[out], n_rows, filename, start, end, missing))
+        totals[out] += n_rows
+
+    outputs = [(_shared_array((n, n_features), dtype), _shared_array((n,), dtype)) for n in totals]
+    _LIBSVM_OUTPUTS.update(enumerate(outputs))
+    try:
+        if use_pool:
+            with ctx.Pool(min(n_jobs, len(tasks))) as pool:
+                pool.map(_parse_libsvm_range, tasks, chunksize=1)
+        else:
+            for task in tasks:
+                _parse_libsvm_range(task)
+    finally:
+        _LIBSVM_OUTPUTS.clear()
+    return outputs
+
+
+def read_libsvm_msrank_legacy(file_obj, n_samples, n_features, dtype):
+    """Line-by-line regex parser, kept as the baseline for msrank_load_bench.py."""
     X = np.zeros((n_samples, n_features))
     y = np.zeros((n_samples,))
 
@@ -116,11 +1357,11 @@ def read_libsvm_msrank(file_obj, n_samples, n_features, dtype):
     return np.array(X, dtype=dtype), np.array(y, dtype=dtype)
 
 
-def _make_gen(reader):
-    b = reader(1024 * 1024)
+def _make_gen(reader, size=1024 * 1024):
+    b = reader(size)
     while b:
         yield b
-        b = reader(1024 * 1024)
+        b = reader(size)
 
 
 def _count_lines(filename):
@@ -128,12 +1369,48 @@ def _count_lines(filename):
         f_gen = _make_gen(f.read)
         return sum(buf.count(b'\n') for buf in f_gen)
 
-def load_msrank_10k(dtype):
+def read_msrank_archive(tar_name, n_features, dtype):
+    """
+    Parses train/vali/test.txt straight from the compressed MSRank archive,
+    member stream by member stream, so nothing uncompressed touches the disk.
+    Returns (x_train, y_train, x_test, y_test) with vali stacked after train.
+    """
+    builders, seen = {}, set()
+    with tarfile.open(tar_name, "r|gz") as tar:
+        for member in tar:
+            name = os.path.basename(member.name)
+            if not member.isfile() or name not in ('train.txt', 'vali.txt', 'test.txt'):
+                continue
+            seen.add(name)
+            if name == 'vali.txt' and 'train.txt' in builders:
+                builder = builders['train.txt']  # append, no stacking copy
+            else:
+                builder = builders[name] = LibSVMBuilder(n_features, dtype)
+            print("Reading", member.name)
+            _feed_libsvm(builder, tar.extractfile(member), member.size)
+            builder.flush()
+
+    missing = set(['train.txt', 'vali.txt', 'test.txt']) - seen
+    if missing:
+        raise ValueError("%s lacks %s" % (tar_name, ", ".join(sorted(missing))))
+
+    x_train, y_train = builders['train.txt'].finish()
+    if 'vali.txt' in builders:  # vali came first in the archive
+        x_vali, y_vali = builders['vali.txt'].finish()
+        x_train, y_train = np.vstack((x_train, x_vali)), np.hstack((y_train, y_vali))
+    x_test, y_test = builders['test.txt'].finish()
+    return x_train, y_train, x_test, y_test
+
+
+@dataset_cache("msrank.tar.gz", ignore=("n_jobs", "from_archive"))
+def load_msrank_10k(dtype, n_jobs=None, from_archive=False):
     """
     Dataset from szilard benchmarks: https://github.com/szilard/GBM-perf
     TaskType:binclass
     NumberOfFeatures:700
     NumberOfInstances:10100000
+    With from_archive=True the splits are parsed from msrank.tar.gz directly
+    instead of being extracted to DATASET_DIR first.
     """
 
     url = "https://storage.mds.yandex.net/get-devtools-opensource/471749/msrank.tar.gz"
@@ -143,44 +1420,35 @@ def load_msrank_10k(dtype):
         print("Loading data set...")
         download_file(url)
 
+    n_features = 137
+
+    if from_archive:
+        print("Reading data set from", tar)
+        x_train, y_train, x_test, y_test = read_msrank_archive(tar, n_features, dtype)
+        return x_train, y_train, x_test, y_test, len(np.unique(y_train))
+
     if not os.path.isfile(DATASET_DIR + "MSRank/train.txt"):
         tar = tarfile.open(tar, "r:gz")
         tar.extractall(DATASET_DIR)
         tar.close()
 
-    sets = []
-    labels = []
-    n_features = 137
-
     print("Reading data set...")
-    for set_name in ['train.txt', 'vali.txt', 'test.txt']:
-        file_name = DATASET_DIR + os.path.join('MSRank', set_name)
-
-        n_samples = _count_lines(file_name)
-        with open(file_name, 'r') as file_obj:
-            X, y = read_libsvm_msrank(file_obj, n_samples, n_features, dtype)
-
-        sets.append(X)
-        labels.append(y)
+    # train and vali are parsed into one array, test into another
+    groups = [[DATASET_DIR + os.path.join('MSRank', name) for name in ['train.txt', 'vali.txt']],
+              [DATASET_DIR + os.path.join('MSRank', 'test.txt')]]
+    (x_train, y_train), (x_test, y_test) = read_libsvm_files_parallel(groups, n_features, dtype, n_jobs)
 
-    sets[0] = np.vstack((sets[0], sets[1]))
-    labels[0] = np.hstack((labels[0], labels[1]))
+    n_classes = len(np.unique(y_train))
 
-    sets   = [ np.ascontiguousarray(sets[i]) for i in [0, 2]]
-    labels = [ np.ascontiguousarray(labels[i]) for i in [0, 2]]
+    return x_train, y_train, x_test, y_test, n_classes
 
-    n_classes = len(np.unique(labels[0]))
 
-    return sets[0], labels[0], sets[1], labels[1], n_classes
+AIRLINE_CATEGORICAL = ["Month", "DayofMonth", "DayOfWeek", "UniqueCarrier", "Origin", "Dest"]
+AIRLINE_CATEGORICAL_IDS = [0, 1, 2, 4, 5, 6]
+AIRLINE_NUMERIC = ["DepTime", "Distance"]
 
 
-def load_airline_one_hot(dtype):
-    """
-    Dataset from szilard benchmarks: https://github.com/szilard/GBM-perf
-    TaskType:binclass
-    NumberOfFeatures:700
-    NumberOfInstances:10100000
-    """
+def _read_airline():
     url = 'https://s3.amazonaws.com/benchm-ml--main/'
 
     name_train = 'train-10m.csv'
@@ -189,21 +1457,16 @@ def load_airline_one_hot(dtype):
     sets = []
     labels = []
 
-    categorical_names = ["Month", "DayofMonth", "DayOfWeek", "UniqueCarrier", "Origin", "Dest"]
-    categorical_ids = [0, 1, 2, 4, 5, 6]
-
-    numeric_names = ["DepTime", "Distance"]
-    numeric_ids = [3, 7]
-
     for name in [name_train, name_test]:
         filename = os.path.join(DATASET_DIR, name)
         if not os.path.exists(filename):
             print("Loading", filename)
+            from urllib.request import urlretrieve
             urlretrieve(url + name, filename)
 
         print("Reading", filename)
         df = pd.read_csv(filename, nrows=1000000) if name == 'train-10m.csv' else pd.read_csv(filename)
-        X = df.drop('dep_delayed_15min', 1)
+        X = df.drop('dep_delayed_15min', axis=1)
         y = df["dep_delayed_15min"]
 
         y_num = np.where(y == "Y", 1, 0)
@@ -211,10 +1474,223 @@ def load_airline_one_hot(dtype):
         sets.append(X)
         labels.append(y_num)
 
+    return sets, labels
+
+
+@dataset_cache("train-10m.csv", "test.csv")
+def load_airline_one_hot(dtype):
+    """
+    Dataset from szilard benchmarks: https://github.com/szilard/GBM-perf
+    TaskType:binclass
+    NumberOfFeatures:700
+    NumberOfInstances:10100000
+    """
+    sets, labels = _read_airline()
     n_samples_train = sets[0].shape[0]
 
     X = pd.concat(sets)
-    X = pd.get_dummies(X, columns=categorical_names)
+    X = pd.get_dummies(X, columns=AIRLINE_CATEGORICAL)
     sets = [X[:n_samples_train], X[n_samples_train:]]
 
     return sets[0], labels[0], sets[1], labels[1], 2
+
+
+@dataset_cache("train-10m.csv", "test.csv")
+def load_airline_one_hot_sparse(dtype):
+    """
+    Same features and column order as load_airline_one_hot, built directly
+    as scipy.sparse CSR matrices: every row stores its two numeric values
+    and one 1.0 per categorical column. The category vocabulary is taken
+    from train and test together, so both share the same columns.
+    Note that XGBoost treats entries absent from a CSR matrix as missing
+    rather than 0, so its trees may differ slightly from the dense path.
+    """
+    sets, labels = _read_airline()
+    n_samples_train = sets[0].shape[0]
+    X = pd.concat(sets)
+
+    n_cols = len(AIRLINE_NUMERIC) + len(AIRLINE_CATEGORICAL)
+    indices = np.empty((X.shape[0], n_cols), dtype=np.int32)
+    data = np.ones((X.shape[0], n_cols), dtype=dtype)
+
+    indices[:, :len(AIRLINE_NUMERIC)] = np.arange(len(AIRLINE_NUMERIC))
+    data[:, :len(AIRLINE_NUMERIC)] = X[AIRLINE_NUMERIC].to_numpy(dtype=dtype)
+
+    offset = len(AIRLINE_NUMERIC)
+    for j, name in enumerate(AIRLINE_CATEGORICAL):
+        column = pd.Categorical(X[name])  # sorted vocabulary, as get_dummies
+        codes = column.codes
+        indices[:, len(AIRLINE_NUMERIC) + j] = offset + np.maximum(codes, 0)
+        data[codes < 0, len(AIRLINE_NUMERIC) + j] = 0  # NaN category: no dummy set
+        offset += len(column.categories)
+
+    def csr(rows):
+        n = rows.stop - rows.start
+        indptr = np.arange(0, (n + 1) * n_cols, n_cols, dtype=np.int64)
+        return sparse.csr_matrix((data[rows].ravel(), indices[rows].ravel(), indptr), shape=(n, offset))
+
+    x_train = csr(slice(0, n_samples_train))
+    x_test = csr(slice(n_samples_train, X.shape[0]))
+    return x_train, labels[0], x_test, labels[1], 2
+
+
+@dataset_cache("train-10m.csv", "test.csv")
+def load_airline_categorical(dtype):
+    """
+    Airline data with the six categorical columns kept as integer codes
+    (columns AIRLINE_CATEGORICAL_IDS) instead of one-hot dummies, for the
+    native categorical support of LightGBM and XGBoost. Codes come from a
+    vocabulary shared by train and test; unknown values are NaN.
+    """
+    sets, labels = _read_airline()
+    n_samples_train = sets[0].shape[0]
+
+    X = pd.concat(sets)
+    for name in AIRLINE_CATEGORICAL:
+        X[name] = pd.Categorical(X[name]).codes
+    X = X.to_numpy(dtype=dtype)
+    X[:, AIRLINE_CATEGORICAL_IDS] = np.where(X[:, AIRLINE_CATEGORICAL_IDS] < 0, np.nan,
+                                             X[:, AIRLINE_CATEGORICAL_IDS])
+
+    x_train = np.ascontiguousarray(X[:n_samples_train])
+    x_test = np.ascontiguousarray(X[n_samples_train:])
+    return x_train, labels[0], x_test, labels[1], 2
+
+
+# Shape of the 'synthetic' data set, overridable with BENCH_SYNTHETIC, e.g.
+# BENCH_SYNTHETIC="rows=50e6,features=50,classes=5,sparsity=0.3,categorical=4,cardinality=1000".
+# Categorical features are the first `categorical` columns, as integer codes.
+SYNTHETIC_DEFAULTS = {"rows": 1000000, "test_rows": 100000, "features": 28, "classes": 2,
+                      "sparsity": 0.0, "categorical": 0, "cardinality": 32, "seed": 0}
+# Generated in chunks of about this many bytes of features at a time.
+SYNTHETIC_CHUNK_BYTES = 32 * 2**20
+
+
+def parse_synthetic(spec):
+    config = dict(SYNTHETIC_DEFAULTS)
+    for item in filter(None, spec.split(",")):
+        name, value = item.split("=", 1)
+        if name.strip() not in config:
+            raise ValueError("unknown BENCH_SYNTHETIC setting %r, use %s" % (name, ", ".join(config)))
+        config[name.strip()] = float(value) if name.strip() == "sparsity" else int(float(value))
+    if not 0 <= config["categorical"] <= config["features"] or config["classes"] < 2:
+        raise ValueError("BENCH_SYNTHETIC needs 0 <= categorical <= features and classes >= 2")
+    return config
+
+
+def _synthetic_model(config):
+    """Fixed per seed: weights on tanh(x), a few pairwise products and per-category class effects."""
+    rng = np.random.default_rng(config["seed"])
+    n_numeric = config["features"] - config["categorical"]
+    classes = config["classes"]
+    return {
+        "weights": rng.standard_normal((n_numeric, classes)) * 2 / np.sqrt(max(1, n_numeric)),
+        "pairs": rng.integers(0, max(1, n_numeric), (min(n_numeric, 8), 2)),
+        "pair_weights": rng.standard_normal((min(n_numeric, 8), classes)),
+        "category_effects": rng.standard_normal((config["categorical"], config["cardinality"], classes)),
+    }
+
+
+def _synthetic_chunk(rng, n_rows, config, model):
+    n_cat = config["categorical"]
+    x = rng.standard_normal((n_rows, config["features"]), dtype=np.float32)
+    codes = rng.integers(0, config["cardinality"], (n_rows, n_cat))
+    x[:, :n_cat] = codes
+    numeric = x[:, n_cat:]
+    if config["sparsity"] > 0:
+        numeric[rng.random(numeric.shape, dtype=np.float32) < config["sparsity"]] = 0
+
+    score = np.tanh(numeric) @ model["weights"]
+    if len(model["pairs"]):
+        pairs = model["pairs"]
+        score += (numeric[:, pairs[:, 0]] * numeric[:, pairs[:, 1]]) @ model["pair_weights"]
+    for j in range(n_cat):
+        score += model["category_effects"][j, codes[:, j]]
+    # Gumbel-max draws the label from softmax(score), so it is learnable but noisy
+    label = np.argmax(score + rng.gumbel(size=score.shape), axis=1)
+    return x, label
+
+
+@measured_load
+def load_synthetic(dtype, **overrides):
+    """
+    Generated classification data, no download needed. Shape and seed come
+    from BENCH_SYNTHETIC, read on every call, and `overrides`. Rows are generated in
+    chunks of about SYNTHETIC_CHUNK_BYTES straight into .npy files under
+    DATASET_CACHE_DIR, which are memory mapped on this and later runs, so
+    data sets far larger than RAM can be built. Every chunk has its own
+    random stream, so the data depends only on the settings.
+    """
+    config = dict(parse_synthetic(os.environ.get("BENCH_SYNTHETIC", "")), **overrides)
+    CATEGORICAL_FEATURES['synthetic'] = list(range(config["categorical"]))
+    dtype = np.dtype(dtype)
+    key_src = json.dumps([_CACHE_VERSION, "load_synthetic", dtype.name, config], sort_keys=True)
+    key = "load_synthetic-%s" % hashlib.sha1(key_src.encode()).hexdigest()[:12]
+    path = os.path.join(DATASET_CACHE_DIR, key)
+    meta_file = os.path.join(path, "meta.json")
+    if os.path.isfile(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        print("Reading generated data set", path)
+        os.utime(meta_file)
+        return _load_cache_entry(path, meta)
+
+    print("Generating data set", config)
+    start = timeit.default_timer()
+    tmp = "%s.tmp-%d" % (path, os.getpid())
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    model = _synthetic_model(config)
+    chunk_rows = max(1024, SYNTHETIC_CHUNK_BYTES // (4 * config["features"]))
+    for stream, (x_field, y_field, n_rows) in enumerate([("x_train", "y_train", config["rows"]),
+                                                         ("x_test", "y_test", config["test_rows"])]):
+        x = np.lib.format.open_memmap(os.path.join(tmp, x_field + ".npy"), mode="w+", dtype=dtype,
+                                      shape=(n_rows, config["features"]))
+        y = np.lib.format.open_memmap(os.path.join(tmp, y_field + ".npy"), mode="w+", dtype=dtype,
+                                      shape=(n_rows,))
+        for i, first in enumerate(range(0, n_rows, chunk_rows)):
+            last = min(first + chunk_rows, n_rows)
+            rng = np.random.default_rng([config["seed"], stream, i])
+            x[first:last], y[first:last] = _synthetic_chunk(rng, last - first, config, model)
+        x.flush()
+        y.flush()
+        del x, y
+
+    meta = {"version": _CACHE_VERSION, "loader": "load_synthetic", "params": dict(config, dtype=dtype.name),
+            "sources": {}, "created": time.time(), "sparse": {}, "n_classes": config["classes"]}
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=1)
+    shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp, path)
+    except OSError:  # another process generated the same data set first
+        shutil.rmtree(tmp, ignore_errors=True)
+    print("Data set generated in {:.1f} sec".format(timeit.default_timer() - start))
+    evict_dataset_cache(keep=(key,))
+    return _load_cache_entry(path, meta)
+
+
+def matrix_nbytes(x):
+    """Memory held by a feature matrix: ndarray, DataFrame or scipy.sparse."""
+    if issparse(x):
+        return x.data.nbytes + x.indices.nbytes + x.indptr.nbytes
+    if isdataframe(x):
+        return int(x.memory_usage(index=False).sum())
+    return np.asarray(x).nbytes
+
+
+DATASETS = {
+    'higgs1m': load_higgs1m,
+    'higgs': load_higgs_full,
+    'msrank-10k': load_msrank_10k,
+    'airline-ohe': load_airline_one_hot,
+    'airline-ohe-sparse': load_airline_one_hot_sparse,
+    'airline-cat': load_airline_categorical,
+    'synthetic': load_synthetic,
+}
+
+# Column indices to train as native categorical features, per data set.
+CATEGORICAL_FEATURES = {
+    'airline-cat': AIRLINE_CATEGORICAL_IDS,
+    'synthetic': [],  # set by load_synthetic from its settings
+}
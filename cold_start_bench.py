@@ -0,0 +1,232 @@
+"""
+Cold start of a prediction-only process: every run is a fresh interpreter
+that loads a booster from the model cache and scores one batch, timing
+each step on its own so the cost of a new serving process, a scale-out
+replica or a serverless call can be split up:
+
+    import bench_utils, import xgboost / lightgbm, load model,
+    first predict, second predict (warm, for contrast),
+    import daal4py, daal conversion, load daal model (the cached
+    conversion), first daal predict, second daal predict
+
+"process total" is the wall time of the whole child as seen from the
+parent, so what it adds over the steps is interpreter start and exit.
+The first run of a model is listed separately: later runs read the model
+and library files from the OS page cache.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import collections
+
+WORKER_TAG = "COLD_START "
+# modules a prediction-only process should not import
+HEAVY_MODULES = ['pandas', 'scipy', 'sklearn', 'requests']
+
+
+def run_worker(argv):
+    """Times the steps in this fresh interpreter and prints them as one tagged JSON line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model_dir', required=True)
+    parser.add_argument('--rows', required=True)
+    parser.add_argument('--daal', action='store_true')
+    args = parser.parse_args(argv)
+    timings, heavy = collections.OrderedDict(), {}
+
+    def step(name, func):
+        loaded = set(sys.modules)
+        cpu_start, start = time.process_time(), time.perf_counter()
+        result = func()
+        timings[name] = (time.perf_counter() - start, time.process_time() - cpu_start)
+        for module in HEAVY_MODULES:
+            if module in sys.modules and module not in loaded:
+                heavy[module] = name
+        return result
+
+    step('import bench_utils', lambda: importlib.import_module('bench_utils'))
+    import numpy as np
+    with open(os.path.join(args.model_dir, "meta.json")) as f:
+        meta = json.load(f)
+    rows = np.load(args.rows)
+
+    if meta['library'] == 'xgb':
+        xgb = step('import xgboost', lambda: importlib.import_module('xgboost'))
+        booster = step('load model', lambda: xgb.Booster(model_file=os.path.join(args.model_dir, "booster.ubj")))
+        predict = lambda: booster.inplace_predict(rows)
+    else:
+        lgb = step('import lightgbm', lambda: importlib.import_module('lightgbm'))
+        booster = step('load model', lambda: lgb.Booster(model_file=os.path.join(args.model_dir, "booster.txt")))
+        predict = lambda: booster.predict(rows)
+    step('first predict', predict)
+    step('second predict', predict)
+
+    if args.daal:
+        d4p = step('import daal4py', lambda: importlib.import_module('daal4py'))
+        if meta['library'] == 'xgb':
+            # a copy, as cached_daal_model converts it
+            daal_model = step('daal conversion', lambda: d4p.get_gbt_model_from_xgboost(booster.copy()))
+        else:
+            daal_model = step('daal conversion', lambda: d4p.get_gbt_model_from_lightgbm(booster))
+        pickled = os.path.join(args.model_dir, "daal.pkl")
+        if os.path.isfile(pickled):
+            import pickle
+
+            def unpickle():
+                with open(pickled, "rb") as f:
+                    return pickle.load(f)
+            daal_model = step('load daal model', unpickle)
+        n_classes = meta.get('n_classes', 2)
+        fptype = 'float' if rows.dtype == np.float32 else 'double'
+        if n_classes == -1:
+            daal_predict = lambda: d4p.gbt_regression_prediction(fptype=fptype).compute(rows, daal_model)
+        else:
+            daal_predict = lambda: d4p.gbt_classification_prediction(
+                nClasses=n_classes, resultsToEvaluate="computeClassLabels", fptype=fptype).compute(rows, daal_model)
+        step('first daal predict', daal_predict)
+        step('second daal predict', daal_predict)
+
+    print(WORKER_TAG + json.dumps({'timings': timings, 'heavy_modules': heavy}))
+
+
+# The worker runs before bench_utils is imported, so that import can be timed.
+if __name__ == '__main__' and sys.argv[1:2] == ['--worker']:
+    run_worker(sys.argv[2:])
+    sys.exit(0)
+
+import tempfile
+import subprocess
+from bench_utils import *
+from bench_utils import _record_result
+
+N_RUNS = 10
+N_ROWS = 1
+DTYPE=np.float32
+
+
+def prepare_models(dataset, libraries, n_iter, daal):
+    """Trains one booster per library on `dataset` and saves it (and its conversion) to the model cache."""
+    from bench_runner import load_dataset
+    from backends import XGBStock, LGBStock
+    data = load_dataset(dataset, DTYPE)
+    names = []
+    for library in libraries:
+        backend = {'xgb': XGBStock, 'lgb': LGBStock}[library](data, n_iter=n_iter)
+        backend.setup()
+        backend.construct()
+        backend.fit()
+        name = "cold_start-%s-%s" % (library, dataset)
+        # saved before conversion, which sets feature names on an XGBoost booster
+        save_models(backend.model, name=name, dataset=dataset, n_classes=data['n_classes'])
+        if daal:
+            cached_daal_model(backend.model, dataset=dataset, n_classes=data['n_classes'])
+        names.append(name)
+    return names, data['x_test']
+
+
+def model_rows(path, meta, n_rows, x_test=None):
+    """First test rows of the data set, else normal random rows as wide as the model."""
+    if x_test is not None:
+        return np.ascontiguousarray(x_test[:n_rows], dtype=DTYPE)
+    if meta['library'] == 'xgb':
+        import xgboost as xgb
+        n_features = xgb.Booster(model_file=os.path.join(path, "booster.ubj")).num_features()
+    else:
+        import lightgbm as lgb
+        n_features = lgb.Booster(model_file=os.path.join(path, "booster.txt")).num_feature()
+    return np.random.RandomState(0).standard_normal((n_rows, n_features)).astype(DTYPE)
+
+
+def cold_start(path, rows_file, daal, python=sys.executable):
+    """One fresh interpreter; returns ({step: (wall, cpu)}, {heavy module: step that imported it}) or None."""
+    command = [python, os.path.abspath(__file__), '--worker', '--model_dir', path, '--rows', rows_file]
+    if daal:
+        command.append('--daal')
+    start = timeit.default_timer()
+    proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    total = timeit.default_timer() - start
+    lines = [line for line in proc.stdout.splitlines() if line.startswith(WORKER_TAG)]
+    if proc.returncode != 0 or not lines:
+        print("cold start of %s failed with code %d:\n%s" % (path, proc.returncode, proc.stdout[-2000:]))
+        return None
+    report = json.loads(lines[-1][len(WORKER_TAG):])
+    timings = collections.OrderedDict((step, tuple(times)) for step, times in report['timings'].items())
+    timings['process total'] = (total, 0.)
+    return timings, report['heavy_modules']
+
+
+def print_steps(label, runs):
+    print("\n%-22s %10s %10s %10s %10s" % (label, "first ms", "median ms", "p95 ms", "cpu ms"))
+    for step in runs[0]:
+        wall = np.array([run[step][0] for run in runs]) * 1e3
+        cpu = np.array([run[step][1] for run in runs]) * 1e3
+        print("%-22s %10.2f %10.2f %10.2f %10s" % (step, wall[0], np.median(wall), np.percentile(wall, 95),
+                                                   "-" if step == 'process total' else "%.2f" % np.median(cpu)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Times import, model load, daal4py conversion and first prediction in fresh interpreters")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--models', nargs='+', default=None,
+                        help='model keys or names from the model cache, e.g. xgb_stock_daal-higgs1m')
+    source.add_argument('--dataset', choices=list(DATASETS), metavar='stage', default=None,
+                        help='train a model per library on this data set first and predict its test rows')
+    parser.add_argument('--libraries', nargs='+', choices=['xgb', 'lgb'], default=['xgb', 'lgb'],
+                        help='libraries to train with --dataset')
+    parser.add_argument('--n_iter', default=None, required=False, type=int,
+                        help='boosting rounds with --dataset [Default=n_estimators of the preset]')
+    parser.add_argument('--n_runs', default=N_RUNS, type=int, help='fresh interpreters per model')
+    parser.add_argument('--rows', default=N_ROWS, type=int, help='rows in the predicted batch')
+    parser.add_argument('--no-daal', action='store_true', help='skip the daal4py steps')
+    parser.add_argument('--python', default=sys.executable, help='interpreter to start [Default=this one]')
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    return args
+
+
+def main():
+    args = parse_args()
+    names, x_test = args.models, None
+    if args.dataset:
+        names, x_test = prepare_models(args.dataset, args.libraries, args.n_iter, not args.no_daal)
+
+    heavy = {}
+    for name in names:
+        path, meta = model_entry(name)
+        fd, rows_file = tempfile.mkstemp(suffix=".npy")
+        os.close(fd)
+        try:
+            np.save(rows_file, model_rows(path, meta, args.rows, x_test))
+            print("Starting %d interpreters for %s (%s) ..." % (args.n_runs, name, meta['key']))
+            runs = []
+            for _ in range(args.n_runs):
+                run = cold_start(path, rows_file, not args.no_daal, args.python)
+                if run is None:
+                    break
+                runs.append(run[0])
+                for module, step in run[1].items():
+                    heavy.setdefault(module, set()).add(step)
+        finally:
+            os.remove(rows_file)
+        if not runs:
+            continue
+
+        backend = "%s-stock" % meta['library']
+        for step in runs[0]:
+            set_result_context(dataset=meta.get('dataset'), backend=backend, phase="cold start " + step,
+                               rows=args.rows, python=args.python)
+            _record_result("%s cold start %s" % (meta['library'], step), run_worker,
+                           [run[step][0] for run in runs], [run[step][1] for run in runs], model=meta['key'])
+        print_steps("%s %s" % (meta['library'], meta['key'][4:12]), runs)
+
+    if heavy:
+        print("\nImported on the prediction path: %s" % ", ".join(
+            "%s (by %s)" % (module, ", ".join(sorted(steps))) for module, steps in sorted(heavy.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import csv
+from bench_utils import *
+from bench_utils import _record_result
+from bench_runner import load_dataset
+from backends import BACKENDS
+
+DTYPE=np.float32
+# Fractions above the common target at which time to quality is also reported
+TARGET_STEPS = [1.10, 1.05, 1.01, 1.0]
+
+
+def trainable_backends():
+    return [name for name, cls in BACKENDS.items() if cls.trainable]
+
+
+def final_logloss(backend):
+    """Logloss of the finished model from its own predictions, computed the same way for every library."""
+    backend.predict()
+    prediction = np.asarray(backend.prediction)
+    if prediction.ndim == 2 and prediction.shape[1] == 1:
+        prediction = prediction[:, 0]
+    return compute_logloss(np.asarray(backend.data['y_test']), prediction)
+
+
+def write_curves(path, curves):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['backend', 'round', 'seconds', 'logloss'])
+        for name, curve in curves.items():
+            for iteration, seconds, loss in curve:
+                writer.writerow([name, iteration, seconds, loss])
+    print("Curves written to", path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Time for each backend to reach a test logloss, from per-round evaluation")
+    parser.add_argument('--dataset', choices=list(DATASETS), metavar='stage', required=True)
+    parser.add_argument('--backends', nargs='+', choices=trainable_backends(), default=trainable_backends())
+    parser.add_argument('--n_iter', default=None, required=False, type=int,
+                        help='boosting rounds [Default=n_estimators of the preset]')
+    parser.add_argument('--preset', default=None, choices=['binary', 'msrank'],
+                        help='parameter preset [Default=by data set]')
+    parser.add_argument('--target', nargs='+', type=float, default=None,
+                        help='test logloss targets [Default=the best logloss every backend reaches, '
+                             'and 10%%, 5%%, 1%% above it]')
+    parser.add_argument('--curves', default=None, help='write every round to this .csv file')
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    return args
+
+
+def main():
+    args = parse_args()
+    data = load_dataset(args.dataset, DTYPE)
+
+    curves, final = {}, {}
+    for name in args.backends:
+        print("Training %s with per-round evaluation ..." % name)
+        backend = BACKENDS[name](data, n_iter=args.n_iter, preset=args.preset)
+        backend.setup()
+        curves[name] = backend.fit_curve()
+        final[name] = final_logloss(backend)
+        print("%s: %d rounds in %.2f sec, test logloss %.5f (recomputed %.5f)" % (
+            name, curves[name][-1][0], curves[name][-1][1], curves[name][-1][2], final[name]))
+
+    targets = args.target
+    if targets is None:
+        common = max(min(loss for _, _, loss in curve) for curve in curves.values())
+        targets = [common * step for step in TARGET_STEPS]
+
+    for name, curve in curves.items():
+        set_result_context(dataset=args.dataset, backend=name)
+        reached = dict((target, time_to_target(curve, target)) for target in targets)
+        _record_result("%s time to quality" % name, BACKENDS[name].fit_curve, [curve[-1][1]], [0.],
+                       curve={'round': [c[0] for c in curve], 'seconds': [c[1] for c in curve],
+                              'logloss': [c[2] for c in curve]},
+                       time_to_target=[[target, hit[1] if hit else None] for target, hit in reached.items()],
+                       final_logloss=final[name])
+
+    print("\n%-14s" % "logloss <=" + "".join("%22s" % name for name in curves))
+    for target in targets:
+        cells = []
+        for name, curve in curves.items():
+            hit = time_to_target(curve, target)
+            cells.append("%22s" % ("%.3f s (round %d)" % (hit[1], hit[0]) if hit else "not reached"))
+        print("%-14.5f" % target + "".join(cells))
+
+    if args.curves:
+        write_curves(args.curves, curves)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""
+Distributed training on localhost: x_train is split row-wise into one shard
+per worker process and the workers train one model together, XGBoost
+through its collective (rabit tracker) and LightGBM through its socket
+based data-parallel mode bound to 127.0.0.1 ports. The physical cores are
+divided between the workers, so every worker count uses the same machine
+as the single-process baseline.
+
+To separate communication from computation, every worker count is also
+run "independent": the same shards trained at the same time without the
+collective. Collective minus independent training time estimates what
+synchronization and gradient-histogram exchange cost.
+"""
+import argparse
+import socket
+import contextlib
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+from bench_utils import *
+from bench_utils import _record_result
+from bench_runner import load_dataset, share_data, attach_data
+from backends import XGBStock, LGBStock
+from thread_sweep import thread_counts
+
+N_PERF_RUNS = 3
+HOST = "127.0.0.1"
+DTYPE=np.float32
+# seconds a worker waits for the others before giving up
+STARTUP_TIMEOUT = 600
+
+
+def free_ports(n):
+    """n currently unused localhost ports for LightGBM to listen on."""
+    sockets = []
+    for _ in range(n):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind((HOST, 0))
+        sockets.append(s)
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def start_xgb_tracker(n_workers):
+    """Starts a rabit tracker for n_workers; returns (tracker, arguments for CommunicatorContext)."""
+    from xgboost.tracker import RabitTracker
+    tracker = RabitTracker(host_ip=HOST, n_workers=n_workers)
+    if hasattr(tracker, 'worker_args'):  # xgboost >= 2.1
+        tracker.start()
+        return tracker, tracker.worker_args()
+    tracker.start(n_workers)
+    return tracker, tracker.worker_envs()
+
+
+def lgb_network(n_workers):
+    """Per-rank LightGBM parameters for a data-parallel job on localhost."""
+    ports = free_ports(n_workers)
+    machines = ",".join("%s:%d" % (HOST, port) for port in ports)
+    return [{'machines': machines, 'local_listen_port': port, 'num_machines': n_workers,
+             'tree_learner': 'data', 'pre_partition': True} for port in ports]
+
+
+def shard(data, rank, n_workers):
+    bounds = np.linspace(0, data['x_train'].shape[0], n_workers + 1).astype(int)
+    lo, hi = bounds[rank], bounds[rank + 1]
+    return dict(data, x_train=data['x_train'][lo:hi], y_train=data['y_train'][lo:hi])
+
+
+def train_xgb(data, n_iter, preset, n_threads, network, barrier):
+    backend = XGBStock(data, n_iter, preset, n_threads=n_threads)
+    backend.setup()
+    import xgboost as xgb
+    context = xgb.collective.CommunicatorContext(**network) if network else contextlib.nullcontext()
+    with context:
+        barrier.wait(STARTUP_TIMEOUT)
+        start = timeit.default_timer()
+        backend.construct()
+        built = timeit.default_timer()
+        backend.fit()
+        done = timeit.default_timer()
+    return backend, {'construction': built - start, 'training': done - built}
+
+
+def train_lgb(data, n_iter, preset, n_threads, network, barrier):
+    import lightgbm as lgb
+    backend = LGBStock(data, n_iter, preset, n_threads=n_threads)
+    backend.setup()
+    backend.params.update(network or {})
+    barrier.wait(STARTUP_TIMEOUT)
+    start = timeit.default_timer()
+    # left unconstructed: in data-parallel mode the bin boundaries are agreed
+    # on over the network, which LightGBM sets up inside train()
+    backend.dtrain = lgb.Dataset(data['x_train'], data['y_train'], params=backend.params,
+                                 categorical_feature=data['cat_features'] or 'auto')
+    built = timeit.default_timer()
+    backend.fit()
+    done = timeit.default_timer()
+    return backend, {'construction': built - start, 'training': done - built}
+
+
+TRAINERS = {'xgb': train_xgb, 'lgb': train_lgb}
+
+
+def _worker(conn, library, rank, n_workers, desc, n_iter, preset, n_threads, cpus, network, barrier, evaluate):
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+        os.environ.update(OMP_NUM_THREADS=str(n_threads), OMP_PROC_BIND='close', OMP_PLACES='cores')
+    data, blocks = attach_data(desc)
+    try:
+        backend, timings = TRAINERS[library](shard(data, rank, n_workers), n_iter, preset,
+                                             n_threads, network, barrier)
+        if evaluate and data['n_classes'] >= 2:
+            backend.predict()
+            timings['logloss'] = compute_logloss(data['y_test'], backend.prediction)
+        del backend
+        conn.send(('ok', timings))
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        del data
+        conn.close()
+
+
+def run_job(library, desc, n_workers, n_iter, preset, cores, collective):
+    """
+    One training job of n_workers processes, each on its share of `cores`.
+    Returns per-rank timings, or None if a worker failed.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    per_worker = max(1, len(cores) // n_workers)
+    networks, tracker = [None] * n_workers, None
+    if collective and n_workers > 1:
+        if library == 'xgb':
+            tracker, args = start_xgb_tracker(n_workers)
+            networks = [args] * n_workers
+        else:
+            networks = lgb_network(n_workers)
+
+    barrier = ctx.Barrier(n_workers)
+    procs, conns = [], []
+    for rank in range(n_workers):
+        cpus = [cores[(rank * per_worker + i) % len(cores)] for i in range(per_worker)]
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=_worker, args=(child, library, rank, n_workers, desc, n_iter, preset,
+                                                 per_worker, cpus, networks[rank], barrier,
+                                                 collective and rank == 0))
+        proc.start()
+        child.close()
+        procs.append(proc)
+        conns.append(parent)
+
+    results, failed = [None] * n_workers, False
+    pending = dict(zip(conns, range(n_workers)))
+    while pending and not failed:
+        for conn in wait(list(pending)):
+            rank = pending.pop(conn)
+            try:
+                status, payload = conn.recv()
+            except EOFError:
+                status, payload = 'error', "worker exited with code %s" % procs[rank].exitcode
+            if status == 'ok':
+                results[rank] = payload
+            else:
+                print("%s worker %d/%d failed:\n%s" % (library, rank, n_workers, payload))
+                failed = True
+    if failed:
+        # the others are stuck in the barrier or waiting for the dead peer
+        barrier.abort()
+        for proc in procs:
+            proc.terminate()
+    for proc in procs:
+        proc.join()
+    if tracker is not None and not failed:
+        tracker.join()
+    return None if failed else results
+
+
+def slowest(jobs, phase):
+    """Per-run time of a phase: the job is as slow as its slowest worker."""
+    return [max(worker[phase] for worker in job) for job in jobs]
+
+
+def print_scaling(table):
+    """Speedup is against one process on all cores; with the cores split, not growing, 1.0 is break-even."""
+    print("\n%-4s %7s %8s %10s %10s %9s %10s %9s %9s" % (
+        "lib", "workers", "threads", "build s", "train s", "speedup", "indep. s", "comm s", "logloss"))
+    for library, n_workers, per_worker, row in table:
+        base = [r for lib, n, _, r in table if lib == library and n == 1]
+        speedup = base[0]['total'] / row['total'] if base else float('nan')
+        independent = row.get('independent')
+        print("%-4s %7d %8d %10.4f %10.4f %9.2f %10s %9s %9s" % (
+            library, n_workers, per_worker, row['construction'], row['training'], speedup,
+            "-" if independent is None else "%.4f" % independent,
+            "-" if independent is None else "%.4f" % (row['training'] - independent),
+            "-" if row.get('logloss') is None else "%.5f" % row['logloss']))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Trains one model with N local worker processes and reports scaling against one process")
+    parser.add_argument('--dataset', choices=list(DATASETS), metavar='stage', required=True)
+    parser.add_argument('--libraries', nargs='+', choices=list(TRAINERS), default=list(TRAINERS))
+    parser.add_argument('--workers', nargs='+', type=int, default=None,
+                        help='worker counts [Default=1, 2, 4, ... up to the physical core count]')
+    parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
+    parser.add_argument('--n_iter', default=None, required=False, type=int,
+                        help='boosting rounds [Default=n_estimators of the preset]')
+    parser.add_argument('--preset', default=None, choices=['binary', 'msrank'],
+                        help='parameter preset [Default=by data set]')
+    parser.add_argument('--no-independent', action='store_true',
+                        help='skip the runs without communication used to estimate its overhead')
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    return args
+
+
+def main():
+    args = parse_args()
+    cores = physical_cores()
+    counts = args.workers or thread_counts(len(cores))
+    if 1 not in counts:
+        counts = [1] + counts
+    if max(counts) > len(cores):
+        print("Warning: only %d physical cores, workers beyond that share cores" % len(cores))
+    print("Physical cores:", cores)
+
+    data = load_dataset(args.dataset, DTYPE)
+    blocks, desc = share_data(data)
+    table = []
+    try:
+        for library in args.libraries:
+            for n_workers in sorted(set(counts)):
+                per_worker = max(1, len(cores) // n_workers)
+                modes = ['collective'] if n_workers == 1 or args.no_independent else ['collective', 'independent']
+                row = {}
+                for mode in modes:
+                    print("%s: %d worker(s) x %d thread(s), %s ..." % (library, n_workers, per_worker, mode))
+                    jobs = []
+                    for _ in range(args.n_runs):
+                        job = run_job(library, desc, n_workers, args.n_iter, args.preset, cores,
+                                      mode == 'collective')
+                        if job is None:
+                            break
+                        jobs.append(job)
+                    if len(jobs) < args.n_runs:
+                        break
+                    set_result_context(dataset=args.dataset, backend="%s-stock" % library,
+                                       n_workers=n_workers, n_threads=per_worker, mode=mode)
+                    for phase in ('construction', 'training'):
+                        set_result_context(phase=phase)
+                        wall = slowest(jobs, phase)
+                        stats = _record_result("%s %d workers %s %s" % (library, n_workers, mode, phase),
+                                               TRAINERS[library], wall, [0.] * len(wall))
+                        if mode == 'collective':
+                            row[phase] = stats['median']
+                        elif phase == 'training':
+                            row['independent'] = stats['median']
+                    if mode == 'collective':
+                        row['logloss'] = jobs[-1][0].get('logloss')
+                if 'training' in row:
+                    row['total'] = row['construction'] + row['training']
+                    table.append((library, n_workers, per_worker, row))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    print_scaling(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+Lists and compares the benchmark runs appended to the history file by every
+script (see append_history in bench_utils).
+
+    python history.py list
+    python history.py compare                          # latest run vs the run before it on the same CPU
+    python history.py compare --baseline xgboost=1.7.6 --candidate xgboost=2.0.3 --threshold 3
+
+Runs are selected by run id (or a unique prefix), by position (-1 is the
+latest, -2 the one before), or by key=value pairs matched against the
+library versions and environment (host, cpu_model, n_cpus, python) of a
+run, the latest matching run being used. compare pairs the measurements of
+both runs that have the same label and context, tests the repeated wall
+times with Welch's t-test, and exits with status 1 when a measurement got
+slower by more than --threshold percent at significance --alpha. When
+there is nothing to compare with (no such run, no baseline, nothing in
+common) it exits with status 3 instead, so a CI gate can tell the two apart.
+"""
+import argparse
+import collections
+from scipy import stats
+from bench_utils import *
+
+THRESHOLD = 5.
+ALPHA = 0.05
+EXIT_REGRESSION = 1
+EXIT_NOTHING_TO_COMPARE = 3
+
+
+def load_runs(path=None, dataset=None, backend=None, script=None):
+    """Run id -> records, oldest run first, keeping only records of the given data set, backend and script."""
+    runs = collections.OrderedDict()
+    for record in read_history(path):
+        context = record['context']
+        if dataset and context.get('dataset') != dataset:
+            continue
+        if backend and context.get('backend') != backend:
+            continue
+        if script and context.get('script') != script:
+            continue
+        runs.setdefault(record['run'], []).append(record)
+    return runs
+
+
+def run_info(records):
+    """Versions and environment of a run; versions of every record are merged, since libraries get imported lazily."""
+    info = dict(records[0]['environment'])
+    for record in records:
+        info.update(record['versions'])
+    return info
+
+
+def select_run(runs, selector, before=None):
+    """Run id for a selector; `before` restricts key=value and prefix matches to runs older than that run."""
+    ids = list(runs)
+    if selector is not None and re.match(r'^-\d+$', selector):
+        return ids[int(selector)] if 0 < -int(selector) <= len(ids) else None
+    if before is not None:
+        ids = ids[:ids.index(before)]
+    if not ids:
+        return None
+    if selector in (None, 'latest'):
+        return ids[-1]
+    if '=' in selector:
+        pairs = [pair.split('=', 1) for pair in selector.split(',')]
+        matches = [run for run in ids if all(str(run_info(runs[run]).get(k)) == v for k, v in pairs)]
+        return matches[-1] if matches else None
+    matches = [run for run in ids if run.startswith(selector)]
+    if len(matches) > 1:
+        raise ValueError("run id prefix %s is ambiguous: %s" % (selector, ", ".join(matches)))
+    return matches[0] if matches else None
+
+
+def measurement_key(record):
+    return json.dumps([record['label'], record['context']], sort_keys=True)
+
+
+def default_baseline(runs, candidate):
+    """Latest earlier run on the same CPU model that shares at least one measurement with the candidate."""
+    keys = set(measurement_key(r) for r in runs[candidate])
+    cpu_model = runs[candidate][0]['environment']['cpu_model']
+    for run in reversed(list(runs)[:list(runs).index(candidate)]):
+        if runs[run][0]['environment']['cpu_model'] != cpu_model:
+            continue
+        if keys & set(measurement_key(r) for r in runs[run]):
+            return run
+    return None
+
+
+def compare_records(baseline, candidate, threshold=THRESHOLD, alpha=ALPHA):
+    """
+    One row per measurement present in both runs: medians, relative change
+    of the median and the Welch t-test p-value over the per-run wall times.
+    A row is a regression (or improvement) when the change exceeds the
+    threshold in percent and p < alpha; measurements with fewer than two
+    runs on either side cannot be tested.
+    """
+    base = dict((measurement_key(r), r) for r in baseline)
+    rows = []
+    for record in candidate:
+        key = measurement_key(record)
+        if key not in base:
+            continue
+        old, new = np.asarray(base[key]['wall']), np.asarray(record['wall'])
+        old_median, new_median = float(np.median(old)), float(np.median(new))
+        change = 100. * (new_median - old_median) / old_median if old_median > 0 else 0.
+        p = None
+        if len(old) > 1 and len(new) > 1:
+            p = float(stats.ttest_ind(old, new, equal_var=False).pvalue)
+            if np.isnan(p):  # both sides constant
+                p = 1.0 if old_median == new_median else 0.0
+        if p is None:
+            verdict = 'untested'
+        elif p < alpha and change > threshold:
+            verdict = 'REGRESSION'
+        elif p < alpha and change < -threshold:
+            verdict = 'improvement'
+        else:
+            verdict = 'same'
+        rows.append({'label': record['label'], 'context': record['context'], 'baseline': old_median,
+                     'candidate': new_median, 'change': change, 'p': p, 'verdict': verdict})
+    return rows
+
+
+def describe(context):
+    return "/".join(str(context[k]) for k in ('dataset', 'backend', 'phase', 'n_threads') if context.get(k) is not None)
+
+
+def print_run(run, records):
+    info = run_info(records)
+    versions = ", ".join("%s %s" % (name, info[name]) for name in ('xgboost', 'lightgbm', 'daal4py') if name in info)
+    scripts = sorted(set(r['context'].get('script', '') for r in records))
+    print("%-22s %-19s %-24s %4d  %s | %s | %s" % (
+        run, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(records[0]['timestamp'])),
+        ",".join(scripts)[:24], len(records), info['host'], info['cpu_model'], versions))
+
+
+def list_runs(args):
+    runs = load_runs(args.file, args.dataset, args.backend, args.script)
+    if not runs:
+        print("No runs in", args.file or HISTORY_FILE)
+        return
+    print("%-22s %-19s %-24s %4s  %s" % ("run", "date", "script", "n", "host | cpu | versions"))
+    for run in list(runs)[-args.limit:]:
+        print_run(run, runs[run])
+
+
+def nothing_to_compare(message):
+    print(message, file=sys.stderr)
+    sys.exit(EXIT_NOTHING_TO_COMPARE)
+
+
+def compare_runs(args):
+    runs = load_runs(args.file, args.dataset, args.backend, args.script)
+    try:
+        candidate = select_run(runs, args.candidate)
+        if candidate is None:
+            nothing_to_compare("No candidate run matches %s" % (args.candidate or 'latest'))
+        if args.baseline is None:
+            baseline = default_baseline(runs, candidate)
+        else:
+            baseline = select_run(runs, args.baseline, before=candidate if args.candidate is None else None)
+    except ValueError as e:  # an ambiguous selector is a usage error, as for argparse
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    if baseline is None or baseline == candidate:
+        nothing_to_compare("No baseline run to compare %s with" % candidate)
+
+    print("baseline:  ", end="")
+    print_run(baseline, runs[baseline])
+    print("candidate: ", end="")
+    print_run(candidate, runs[candidate])
+    rows = compare_records(runs[baseline], runs[candidate], args.threshold, args.alpha)
+    if not rows:
+        nothing_to_compare("The two runs have no measurement in common")
+
+    print("\n%-40s %-30s %12s %12s %8s %8s  %s" % ("measurement", "context", "baseline s", "candidate s",
+                                                   "change", "p", "verdict"))
+    for row in rows:
+        print("%-40s %-30s %12.4f %12.4f %+7.1f%% %8s  %s" % (
+            row['label'][:40], describe(row['context'])[:30], row['baseline'], row['candidate'], row['change'],
+            "-" if row['p'] is None else "%.3g" % row['p'], row['verdict']))
+
+    regressions = [row for row in rows if row['verdict'] == 'REGRESSION']
+    print("\n%d measurements compared, %d regressions (threshold %.1f%%, alpha %g)" % (
+        len(rows), len(regressions), args.threshold, args.alpha))
+    if regressions:
+        sys.exit(EXIT_REGRESSION)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Lists and compares benchmark runs from the result history")
+    parser.add_argument('--file', default=None, help='history file [Default=%s]' % HISTORY_FILE)
+    parser.add_argument('--dataset', default=None, help='only measurements on this data set')
+    parser.add_argument('--backend', default=None, help='only measurements of this backend')
+    parser.add_argument('--script', default=None, help='only measurements made by this script, e.g. xgb_stock.py')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    list_parser = commands.add_parser('list', help='list the recorded runs')
+    list_parser.add_argument('--limit', default=20, type=int, help='show the latest LIMIT runs')
+    list_parser.set_defaults(func=list_runs)
+
+    compare_parser = commands.add_parser('compare', help='test a run against a baseline, exit 1 on regression')
+    compare_parser.add_argument('--candidate', default=None,
+                                help='run id, -N or key=value[,key=value] [Default=latest run]')
+    compare_parser.add_argument('--baseline', default=None,
+                                help='run id, -N or key=value[,key=value] '
+                                     '[Default=latest earlier run on the same CPU with common measurements]')
+    compare_parser.add_argument('--threshold', default=THRESHOLD, type=float,
+                                help='slowdown of the median in percent that counts as a regression')
+    compare_parser.add_argument('--alpha', default=ALPHA, type=float, help='significance level of the t-test')
+    compare_parser.set_defaults(func=compare_runs)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
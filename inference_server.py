@@ -0,0 +1,240 @@
+"""
+Local micro-batching inference server for the benchmark models.
+
+Clients send rows over TCP on localhost; requests that arrive while the
+model is busy, or within --max_wait_ms of each other, are merged into one
+predict call of at most --max_batch rows. Framing, little endian:
+
+    request:  id, n_rows, n_features (uint32 each), n_rows * n_features float32
+    response: id, n_rows, n_outputs  (uint32 each), n_rows * n_outputs float32
+
+Ids are chosen by the client and echoed back; responses on a connection
+can come back out of order. load_generator.py is the matching client.
+"""
+import argparse
+import signal
+import asyncio
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from bench_utils import *
+
+HOST = "127.0.0.1"
+PORT = 8470
+MAX_BATCH = 512
+MAX_WAIT_MS = 2.0
+DTYPE=np.float32
+
+HEADER = struct.Struct('<III')
+
+
+def model_classes(booster):
+    """Class count of a trained XGBoost or LightGBM booster, 2 for binary models."""
+    if hasattr(booster, 'save_config'):
+        config = json.loads(booster.save_config())
+        return max(2, int(config['learner']['learner_model_param']['num_class']))
+    return max(2, booster.dump_model(num_iteration=1)['num_class'])
+
+
+def load_model(model_file=None, dataset=None, library='xgb', n_iter=None):
+    """
+    Loads a booster: a model key or name from MODEL_CACHE_DIR, a model file
+    (.txt = LightGBM, anything else XGBoost), or trains one on `dataset`.
+    """
+    if model_file and not os.path.isfile(model_file):
+        return load_models(model_file)[0]
+    if model_file:
+        if model_file.endswith('.txt'):
+            import lightgbm as lgb
+            return lgb.Booster(model_file=model_file)
+        import xgboost as xgb
+        return xgb.Booster(model_file=model_file)
+
+    from bench_runner import load_dataset
+    from backends import XGBStock, LGBStock
+    backend = (XGBStock if library == 'xgb' else LGBStock)(load_dataset(dataset, DTYPE), n_iter=n_iter)
+    backend.setup()
+    backend.construct()
+    backend.fit()
+    return backend.model
+
+
+def make_predict(booster, engine='stock'):
+    """predict(rows) -> float32 (n_rows, n_outputs): P(class 1) for binary models, all classes otherwise."""
+    n_classes = model_classes(booster)
+    if engine == 'daal':
+        import daal4py as d4p
+        daal_model = cached_daal_model(booster)
+
+        def predict(rows):
+            # a new algorithm object per call: a reused one keeps the row count of its first input
+            algorithm = d4p.gbt_classification_prediction(nClasses=n_classes, fptype='float',
+                                                          resultsToEvaluate="computeClassProbabilities")
+            probabilities = algorithm.compute(rows, daal_model).probabilities
+            return probabilities[:, 1:] if n_classes == 2 else probabilities
+    elif hasattr(booster, 'inplace_predict'):
+        def predict(rows):
+            return booster.inplace_predict(rows).reshape(len(rows), -1)
+    else:
+        def predict(rows):
+            return booster.predict(rows).reshape(len(rows), -1)
+
+    return lambda rows: np.ascontiguousarray(predict(rows), dtype=np.float32)
+
+
+class MicroBatcher(object):
+    """Merges queued requests into batches of up to max_batch rows, waiting at most max_wait seconds."""
+
+    def __init__(self, predict, max_batch=MAX_BATCH, max_wait=MAX_WAIT_MS / 1000.):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.arrived = asyncio.Event()
+        # a request that did not fit into the previous batch; it opens the next one
+        self.carried = None
+        # one predict at a time; the libraries parallelize inside a call
+        self.executor = ThreadPoolExecutor(1)
+        self.n_batches = 0
+        self.n_rows = 0
+
+    async def submit(self, rows):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((rows, future))
+        self.arrived.set()
+        return await future
+
+    async def _collect(self):
+        """A single request larger than max_batch still goes out whole, as a batch of its own."""
+        if self.carried is not None:
+            items, self.carried = [self.carried], None
+        else:
+            items = [await self.queue.get()]
+        n_rows = len(items[0][0])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while n_rows < self.max_batch:
+            if self.queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                # wait on an event, not on queue.get(): a get() cancelled by the
+                # timeout can swallow the request that arrived at that moment
+                self.arrived.clear()
+                try:
+                    await asyncio.wait_for(self.arrived.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            item = self.queue.get_nowait()
+            if n_rows + len(item[0]) > self.max_batch:
+                self.carried = item
+                break
+            items.append(item)
+            n_rows += len(item[0])
+        return items
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            batch = np.concatenate([rows for rows, _ in items]) if len(items) > 1 else items[0][0]
+            try:
+                result = await loop.run_in_executor(self.executor, self.predict, batch)
+            except Exception as e:
+                print("predict failed on %d rows: %s" % (len(batch), e))
+                for _, future in items:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                continue
+            self.n_batches += 1
+            self.n_rows += len(batch)
+            offset = 0
+            for rows, future in items:
+                if not future.cancelled():
+                    future.set_result(result[offset:offset + len(rows)])
+                offset += len(rows)
+
+
+async def read_message(reader):
+    """Reads one frame; returns (id, float32 array of shape (n_rows, n_cols)) or None at EOF."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+        message_id, n_rows, n_cols = HEADER.unpack(header)
+        payload = await reader.readexactly(n_rows * n_cols * 4)
+    except asyncio.IncompleteReadError:
+        return None
+    return message_id, np.frombuffer(payload, dtype=np.float32).reshape(n_rows, n_cols)
+
+
+def pack_message(message_id, array):
+    array = np.ascontiguousarray(array, dtype=np.float32).reshape(len(array), -1)
+    return HEADER.pack(message_id, array.shape[0], array.shape[1]) + array.tobytes()
+
+
+async def handle_client(batcher, reader, writer):
+    async def answer(message_id, rows):
+        writer.write(pack_message(message_id, await batcher.submit(rows)))
+        await writer.drain()
+
+    tasks = set()
+    while True:
+        message = await read_message(reader)
+        if message is None:
+            break
+        task = asyncio.ensure_future(answer(*message))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    writer.close()
+
+
+async def serve(predict, host=HOST, port=PORT, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    batcher = MicroBatcher(predict, max_batch, max_wait_ms / 1000.)
+    batch_task = asyncio.ensure_future(batcher.run())
+    server = await asyncio.start_server(lambda r, w: handle_client(batcher, r, w), host, port)
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+    print("Serving on %s:%d (max batch %d rows, max wait %.2f ms)" % (host, port, max_batch, max_wait_ms))
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        batch_task.cancel()
+        batcher.executor.shutdown(wait=False)
+        if batcher.n_batches:
+            print("Served %d rows in %d batches, %.1f rows per batch" % (
+                batcher.n_rows, batcher.n_batches, batcher.n_rows / batcher.n_batches))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Micro-batching inference server on localhost")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--model', default=None,
+                        help='saved booster: a model key or name from the model cache, '
+                             'a LightGBM .txt or an XGBoost model file')
+    source.add_argument('--dataset', choices=list(DATASETS), metavar='stage', default=None,
+                        help='train a model on this data set at startup instead')
+    parser.add_argument('--library', choices=['xgb', 'lgb'], default='xgb',
+                        help='library to train with when --dataset is given')
+    parser.add_argument('--n_iter', default=None, type=int,
+                        help='boosting rounds when training [Default=n_estimators of the preset]')
+    parser.add_argument('--engine', choices=['stock', 'daal'], default='stock',
+                        help='predict with the booster itself or its daal4py conversion')
+    parser.add_argument('--port', default=PORT, type=int)
+    parser.add_argument('--max_batch', default=MAX_BATCH, type=int, help='rows per merged predict call')
+    parser.add_argument('--max_wait_ms', default=MAX_WAIT_MS, type=float,
+                        help='how long the first request of a batch waits for more')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    booster = load_model(args.model, args.dataset, args.library, args.n_iter)
+    predict = make_predict(booster, args.engine)
+    asyncio.run(serve(predict, HOST, args.port, args.max_batch, args.max_wait_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Runs a matrix of benchmark jobs (data sets x parameter presets x backends)
+side by side instead of one after another. The physical cores are split
+into disjoint partitions that stay within one NUMA node where possible;
+each job runs in its own process pinned to a free partition, with as many
+threads as the partition has cores, and the next job starts as soon as a
+partition frees up. What a job allocates itself (matrices, histograms,
+trees) lands on its node, as Linux places memory where it is first
+touched; the data set arrays are shared memory or page cache that the
+parent filled, so they stay wherever the parent touched them first.
+
+Co-scheduled jobs still share memory bandwidth (and last-level cache).
+Before the jobs, a copy loop on every core of a partition measures its
+bandwidth alone and with every partition busy; with --verify every job is rerun alone on its
+partition afterwards, and jobs that ran slower next to others are flagged.
+"""
+import argparse
+import itertools
+import multiprocessing
+from multiprocessing.connection import wait
+from bench_utils import *
+from bench_runner import load_dataset, share_data, _isolated_backend
+from backends import BACKENDS
+
+N_PERF_RUNS = 3
+DTYPE=np.float32
+# slowdown next to other jobs, against running alone, that is reported as interference
+INTERFERENCE_THRESHOLD = 0.10
+PROBE_BYTES = 256 * 2**20
+# copied per core at least, so the loops do not run out of cache
+PROBE_MIN_CORE_BYTES = 32 * 2**20
+PROBE_SECONDS = 2.
+
+
+def partition_cores(n_partitions):
+    """Splits the physical cores into n disjoint lists, spread over the NUMA nodes and not crossing them if possible."""
+    cores = physical_cores()
+    nodes = [[cpu for cpu in cores if cpu in node] for node in numa_nodes()]
+    nodes = [node for node in nodes if node] or [cores]
+    n_partitions = max(1, min(n_partitions, len(cores)))
+    if n_partitions <= len(nodes):
+        partitions = [[] for _ in range(n_partitions)]
+        for i, node in enumerate(nodes):
+            partitions[i % n_partitions].extend(node)
+        return partitions
+    partitions = []
+    for i, node in enumerate(nodes):
+        count = n_partitions // len(nodes) + (1 if i < n_partitions % len(nodes) else 0)
+        partitions.extend([int(cpu) for cpu in part] for part in np.array_split(node, min(count, len(node))))
+    return partitions
+
+
+def _bandwidth_probe(conn, cpu, nbytes, seconds, barrier):
+    os.sched_setaffinity(0, [cpu])
+    a = np.ones(nbytes // 8)
+    b = np.empty_like(a)
+    np.copyto(b, a)  # fault the pages in before timing
+    barrier.wait()
+    copies, start = 0, timeit.default_timer()
+    while timeit.default_timer() - start < seconds:
+        np.copyto(b, a)
+        copies += 1
+    conn.send(2. * a.nbytes * copies / (timeit.default_timer() - start))
+    conn.close()
+
+
+def probe_bandwidth(partitions, nbytes=PROBE_BYTES, seconds=PROBE_SECONDS):
+    """
+    Copy bandwidth in bytes/sec of a partition, with one copy loop per core
+    as its jobs use every core: (first partition alone, [each partition with
+    all of them busy]). Each partition copies about `nbytes` in total.
+    """
+    ctx = multiprocessing.get_context('spawn')
+
+    def run(parts):
+        cpus = [(i, cpu) for i, part in enumerate(parts) for cpu in part]
+        barrier = ctx.Barrier(len(cpus))
+        conns, procs = [], []
+        for i, cpu in cpus:
+            per_core = max(PROBE_MIN_CORE_BYTES, nbytes // len(parts[i]))
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_bandwidth_probe, args=(child, cpu, per_core, seconds, barrier))
+            proc.start()
+            child.close()
+            conns.append(parent)
+            procs.append(proc)
+        rates = [0.] * len(parts)
+        for (i, _), conn in zip(cpus, conns):
+            rates[i] += conn.recv()
+        for proc in procs:
+            proc.join()
+        return rates
+
+    return run(partitions[:1])[0], run(partitions)
+
+
+def run_jobs(jobs, descs, partitions, args, schedule='concurrent', indices=None):
+    """
+    Starts every job on the next free partition (of `indices`, default all),
+    as many at a time as there are partitions. Returns {job: (partition
+    index, {phase: seconds})}.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    free = list(range(len(partitions)) if indices is None else indices)
+    pending, running, results = list(jobs), {}, {}
+    while pending or running:
+        while pending and free:
+            job, index = pending.pop(0), free.pop(0)
+            dataset, preset, name = job
+            cpus = partitions[index]
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_isolated_backend,
+                               args=(child, name, descs[dataset], args.n_runs, args.n_iter,
+                                     None if preset == 'auto' else preset, args.warmup,
+                                     measure_settings(), len(cpus), cpus))
+            proc.start()
+            child.close()
+            running[parent] = (job, index, proc)
+            print("%s %s/%s/%s on partition %d (CPUs %s)" % (
+                "Starting" if schedule == 'concurrent' else "Rerunning alone", dataset, preset, name, index, cpus))
+
+        for conn in wait(list(running)):
+            job, index, proc = running.pop(conn)
+            try:
+                status, payload = conn.recv()
+            except EOFError:
+                status, payload = 'error', "process exited with code %s" % proc.exitcode
+            proc.join()
+            free.append(index)
+            if status != 'ok':
+                print("%s failed:\n%s" % ("/".join(job), payload))
+                continue
+            phases, records = payload
+            for record in records:
+                record['context'].update(preset=job[1], partition=index, schedule=schedule)
+            RESULTS.extend(records)
+            results[job] = (index, phases)
+    return results
+
+
+def print_jobs(results, solo=None, contended=False):
+    phases = []
+    for _, job_phases in results.values():
+        phases += [phase for phase in job_phases if phase not in phases]
+    header = "%-18s %-7s %-11s %4s" % ("dataset", "preset", "backend", "part") + \
+             "".join("%13s" % phase for phase in phases) + "%10s" % "total"
+    if solo is not None:
+        header += "%10s %10s  %s" % ("alone", "slowdown", "interference")
+    print("\n" + header)
+    for job, (index, job_phases) in results.items():
+        total = sum(job_phases.values())
+        line = "%-18s %-7s %-11s %4d" % (job[0][:18], job[1], job[2], index) + \
+               "".join("%13.4f" % job_phases[phase] if phase in job_phases else "%13s" % "-" for phase in phases) + \
+               "%10.4f" % total
+        if solo is not None and job in solo:
+            alone = solo[job][1]
+            slowdown = dict((phase, job_phases[phase] / alone[phase] - 1) for phase in job_phases
+                            if alone.get(phase, 0) > 0)
+            worst = max(slowdown, key=slowdown.get) if slowdown else None
+            flag = ""
+            if worst and slowdown[worst] > INTERFERENCE_THRESHOLD:
+                flag = "yes, %s %+.0f%%%s" % (worst, 100 * slowdown[worst], " (memory bandwidth)" if contended else "")
+            line += "%10.4f %+9.0f%%  %s" % (sum(alone.values()), 100 * (total / sum(alone.values()) - 1), flag)
+        print(line)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Runs data sets x presets x backends concurrently on disjoint, pinned core partitions")
+    parser.add_argument('--datasets', nargs='+', choices=list(DATASETS), metavar='stage', required=True)
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=['xgb-stock', 'lgb-stock'])
+    parser.add_argument('--presets', nargs='+', choices=['auto', 'binary', 'msrank'], default=['auto'],
+                        help='parameter presets; auto picks one by data set')
+    parser.add_argument('--partitions', default=None, type=int,
+                        help='concurrent jobs [Default=one per NUMA node or per 4 physical cores, whichever is more]')
+    parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
+    parser.add_argument('--n_iter', default=None, required=False, type=int,
+                        help='boosting rounds [Default=n_estimators of the preset]')
+    parser.add_argument('--verify', action='store_true',
+                        help='rerun every job alone on its partition and report the slowdown from co-scheduling')
+    parser.add_argument('--no-probe', action='store_true', help='skip the memory bandwidth probe')
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    return args
+
+
+def main():
+    args = parse_args()
+    n_partitions = args.partitions or max(len(numa_nodes()), len(physical_cores()) // 4)
+    partitions = partition_cores(n_partitions)
+    print("Partitions:", partitions)
+
+    contended = False
+    if len(partitions) > 1 and not args.no_probe:
+        alone, together = probe_bandwidth(partitions)
+        share = np.mean(together) / alone
+        contended = share < 1 - INTERFERENCE_THRESHOLD
+        print("Copy bandwidth per partition, all cores copying: %.1f GB/s alone, %.1f GB/s with all %d busy (%.0f%%)%s" % (
+            alone / 1e9, np.mean(together) / 1e9, len(partitions), 100 * share,
+            ", memory bandwidth is shared" if contended else ""))
+
+    jobs = list(itertools.product(args.datasets, args.presets, args.backends))
+    blocks, descs = [], {}
+    for dataset in args.datasets:
+        dataset_blocks, descs[dataset] = share_data(load_dataset(dataset, DTYPE))
+        blocks += dataset_blocks
+    try:
+        start = timeit.default_timer()
+        results = run_jobs(jobs, descs, partitions, args)
+        elapsed = timeit.default_timer() - start
+        solo = None
+        if args.verify and len(partitions) == 1:
+            print("One partition: the jobs ran one after another, nothing to verify")
+        elif args.verify:
+            solo = {}
+            for job, (index, _) in results.items():
+                solo.update(run_jobs([job], descs, partitions, args, schedule='alone', indices=[index]))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    print_jobs(results, solo, contended)
+    print("\n%d jobs on %d partitions in %.1f sec wall" % (len(results), len(partitions), elapsed))
+    if contended and solo is None:
+        print("Memory bandwidth is shared between partitions; rerun with --verify to see which jobs slow down")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import xgboost as xgb
+import lightgbm as lgb
+import daal4py as d4p
+from bench_utils import *
+from bench_runner import load_dataset
+from backends import XGBStock, LGBStock
+
+BATCH_SIZES = [1, 8, 64, 512, 4096]
+N_CALLS = 2000
+N_BATCHES = 32  # distinct batches cycled through, so caches do not see one input only
+DTYPE=np.float32
+
+
+def make_batches(x, batch_size, n_batches=N_BATCHES):
+    """
+    Consecutive slices of x (wrapping around), copied up front: to contiguous
+    arrays, or to CSR matrices of their own when x is CSR.
+    """
+    rows = x.shape[0]
+    batches = []
+    for start in (np.arange(n_batches) * batch_size) % rows:
+        index = np.arange(start, start + batch_size) % rows
+        batches.append(x[index] if issparse(x) else np.ascontiguousarray(np.take(x, index, axis=0)))
+    return batches
+
+
+def daal_algorithm():
+    return d4p.gbt_classification_prediction(nClasses=n_classes, resultsToEvaluate="computeClassLabels",
+                                             fptype='float' if DTYPE == np.float32 else 'double')
+
+
+def predictors():
+    """
+    (label, callable) for every prediction path. predict() on a DMatrix that
+    was scored before is answered from XGBoost's per-matrix prediction cache,
+    so every call builds its DMatrix; reusing one would time cache lookups.
+    """
+    reused_xgb = daal_algorithm()
+    reused_lgb = daal_algorithm()
+    return [
+        ("xgb predict, new DMatrix", lambda x: model_xgb.predict(xgb.DMatrix(x))),
+        ("xgb inplace_predict", lambda x: model_xgb.inplace_predict(x)),
+        ("lgb predict", lambda x: model_lgb.predict(x)),
+        ("xgb daal, new algorithm", lambda x: daal_algorithm().compute(x, daal_xgb)),
+        ("xgb daal, reused algorithm", lambda x: reused_xgb.compute(x, daal_xgb)),
+        ("lgb daal, new algorithm", lambda x: daal_algorithm().compute(x, daal_lgb)),
+        ("lgb daal, reused algorithm", lambda x: reused_lgb.compute(x, daal_lgb)),
+    ]
+
+
+def train_models(data, n_iter):
+    global model_xgb, model_lgb, daal_xgb, daal_lgb
+    models = []
+    for cls in (XGBStock, LGBStock):
+        backend = cls(data, n_iter=n_iter)
+        backend.setup()
+        backend.construct()
+        backend.fit()
+        models.append(backend.model)
+    model_xgb, model_lgb = models
+    daal_xgb = cached_daal_model(model_xgb, dataset=data['dataset'])
+    daal_lgb = cached_daal_model(model_lgb, dataset=data['dataset'])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-call prediction latency across batch sizes")
+    parser.add_argument('--dataset', choices=list(DATASETS), metavar='stage', required=True)
+    parser.add_argument('--n_iter', default=None, required=False, type=int,
+                        help='boosting rounds [Default=n_estimators of the preset]')
+    parser.add_argument('--batch_sizes', nargs='+', type=int, default=BATCH_SIZES)
+    parser.add_argument('--calls', default=N_CALLS, type=int,
+                        help='timed calls per predictor and batch size; p999 needs at least 1000')
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    return args
+
+
+def main():
+    global n_classes
+    args = parse_args()
+
+    data = load_dataset(args.dataset, DTYPE)
+    if data['cat_features']:
+        raise SystemExit("daal4py cannot convert models with categorical splits; use a one-hot data set")
+    n_classes = data['n_classes']
+    print("Training ...")
+    train_models(data, args.n_iter)
+
+    table = []
+    for batch_size in args.batch_sizes:
+        batches = make_batches(data['x_test'], batch_size)
+        for label, func in predictors():
+            set_result_context(dataset=args.dataset, predictor=label, batch_size=batch_size)
+            latency = measure_latency(func, "%-28s batch %5d" % (label, batch_size), batches, args.calls, batch_size)
+            table.append((label, batch_size, latency))
+
+    print("\n%-28s %6s %10s %10s %10s %12s" % ("predictor", "batch", "p50 us", "p99 us", "p999 us", "rows/sec"))
+    for label, batch_size, latency in table:
+        print("%-28s %6d %10.1f %10.1f %10.1f %12.0f" % (label, batch_size, latency['p50'] * 1e6,
+                                                        latency['p99'] * 1e6, latency['p999'] * 1e6,
+                                                        latency['throughput']))
+
+
+if __name__ == '__main__':
+    main()
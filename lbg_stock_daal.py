@@ -3,6 +3,7 @@ import lightgbm as lgb
 import time
 import daal4py as d4p
 from bench_utils import *
+from numpy_forest import NumpyForest
 
 N_PERF_RUNS = 5
 DTYPE=np.float32
@@ -34,18 +35,34 @@ lgb_params = {
 #     "objective": "multiclass"
 }
 
+def lgb_build():
+    global dtrain
+    dtrain = lgb.Dataset(x_train, y_train, params=lgb_params, free_raw_data=False).construct()
+
 def lgb_fit():
-    global model_lgb, daal_model
-    model_lgb = lgb.train(lgb_params, lgb.Dataset(x_train, y_train), 1000)
+    global model_lgb
+    model_lgb = lgb.train(lgb_params, dtrain, 1000)
+
+def lgb_convert():
+    global daal_model
     daal_model = d4p.get_gbt_model_from_lightgbm(model_lgb)
 
 
 def lgb_stock_predict():
+    global prediction
     prediction = model_lgb.predict(x_test)
     
 def lgb_daal_predict():
     d4p.gbt_classification_prediction(nClasses = n_classes, resultsToEvaluate="computeClassLabels", fptype='float').compute(x_test, daal_model)
 
+def lgb_numpy_compile():
+    global numpy_forest
+    numpy_forest = NumpyForest.from_lightgbm(model_lgb)
+
+def lgb_numpy_predict():
+    global numpy_prediction
+    numpy_prediction = numpy_forest.predict(x_test)
+
 
 def load_dataset(dataset):
     global x_train, y_train, x_test, y_test, n_classes
@@ -55,13 +72,8 @@ def load_dataset(dataset):
     except:
         pass
 
-    datasets_dict = {
-        'higgs1m': load_higgs1m,
-        'msrank-10k': load_msrank_10k,
-        'airline-ohe':load_airline_one_hot
-    }
-
-    x_train, y_train, x_test, y_test, n_classes = datasets_dict[dataset](DTYPE)
+    set_result_context(dataset=dataset)
+    x_train, y_train, x_test, y_test, n_classes = DATASETS[dataset](DTYPE)
     print("n_classes: ", n_classes)
 
 #     if n_classes == -1:
@@ -76,23 +88,52 @@ def parse_args():
     parser = argparse.ArgumentParser()
 #     parser.add_argument('--n_iter', required=False, type=int, default=1000)
     parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
-    parser.add_argument('--dataset', choices=['higgs1m', "airline-ohe", "msrank-10k"],
+    parser.add_argument('--dataset', choices=list(DATASETS),
             metavar='stage', required=True)
+    parser.add_argument('--predict_only', nargs='?', const='latest', default=None, metavar='MODEL',
+            help='skip training and conversion: reuse the models saved by the last run on this '
+                 'data set, or the given model key')
 
+    add_measure_args(parser)
     args = parser.parse_args()
+    apply_measure_args(args)
     N_PERF_RUNS = args.n_runs
 
     load_dataset(args.dataset)
+    return args
 
 
 def main():
-    parse_args()
+    global model_lgb, daal_model
+    args = parse_args()
+    model_name = "lgb_stock_daal-" + args.dataset
+
+    if args.predict_only:
+        model_lgb, daal_model, meta = load_models(model_name if args.predict_only == 'latest' else args.predict_only)
+        if daal_model is None:
+            raise SystemExit("model %s has no daal4py conversion saved" % meta['key'])
+        print("Running predictions only ...")
+        measure(lgb_stock_predict, "LGB Stock predict (test data)", N_PERF_RUNS)
+        measure(lgb_daal_predict,  "LGB Daal predict (test data) ", N_PERF_RUNS)
+        lgb_numpy_compile()
+        measure(lgb_numpy_predict, "LGB NumPy predict (test data)", N_PERF_RUNS)
+        print_parity("NumPy forest", numpy_prediction, prediction)
+        return
 
     print("Running ...")
-    measure(lgb_fit,                   "XGBOOST training            ", N_PERF_RUNS)
-    measure(lgb_stock_predict, "LGB Stock predict (test data)", N_PERF_RUNS)
-    measure(lgb_daal_predict,  "LGB Daal predict (test data) ", N_PERF_RUNS)
-   
+    # the Dataset is constructed once and shared by every training repeat
+    measure(lgb_build,                 "LGB Dataset build            ", 1, warmup=0)
+    measure(lgb_fit,                   "LGB training                 ", N_PERF_RUNS)
+    key = save_models(model_lgb, name=model_name, dataset=args.dataset, n_classes=n_classes)
+    stock = measure(lgb_stock_predict, "LGB Stock predict (test data)", N_PERF_RUNS)
+    convert = measure(lgb_convert,     "LGB Daal conversion          ", N_PERF_RUNS)
+    save_daal_model(key, daal_model)
+    daal = measure(lgb_daal_predict,   "LGB Daal predict (test data) ", N_PERF_RUNS)
+    print_break_even(convert, stock, daal)
+    measure(lgb_numpy_compile,         "LGB NumPy forest compile     ", N_PERF_RUNS)
+    measure(lgb_numpy_predict,         "LGB NumPy predict (test data)", N_PERF_RUNS)
+    print_parity("NumPy forest", numpy_prediction, prediction)
+
 
 if __name__ == '__main__':
     main()
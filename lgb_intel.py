@@ -45,13 +45,8 @@ def load_dataset(dataset):
     except:
         pass
 
-    datasets_dict = {
-        'higgs1m': load_higgs1m,
-        'msrank-10k': load_msrank_10k,
-        'airline-ohe':load_airline_one_hot
-    }
-
-    x_train, y_train, x_test, y_test, n_classes = datasets_dict[dataset](DTYPE)
+    set_result_context(dataset=dataset)
+    x_train, y_train, x_test, y_test, n_classes = DATASETS[dataset](DTYPE)
     print("n_classes: ", n_classes)
 
 #     if n_classes == -1:
@@ -66,10 +61,12 @@ def parse_args():
     parser = argparse.ArgumentParser()
 #     parser.add_argument('--n_iter', required=False, type=int, default=1000)
     parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
-    parser.add_argument('--dataset', choices=['higgs1m', "airline-ohe", "msrank-10k"],
+    parser.add_argument('--dataset', choices=list(DATASETS),
             metavar='stage', required=True)
 
+    add_measure_args(parser)
     args = parser.parse_args()
+    apply_measure_args(args)
     N_PERF_RUNS = args.n_runs
 
     load_dataset(args.dataset)
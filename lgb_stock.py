@@ -34,7 +34,7 @@ lgb_params = {
 
 def xbg_fit():
     global model_lgb
-    model_lgb = lgb.train(lgb_params, lgb.Dataset(x_train, y_train), 100)
+    model_lgb = lgb.train(lgb_params, lgb.Dataset(x_train, y_train, categorical_feature=cat_features or 'auto'), 100)
 
 
 def xgb_stock_predict():
@@ -48,22 +48,19 @@ def xgb_daal_predict():
 
 
 def load_dataset(dataset):
-    global x_train, y_train, x_test, y_test, n_classes
+    global x_train, y_train, x_test, y_test, n_classes, cat_features
 
     try:
         os.mkdir(DATASET_DIR)
     except:
         pass
 
-    datasets_dict = {
-        'higgs1m': load_higgs1m,
-        'msrank-10k': load_msrank_10k,
-        'airline-ohe':load_airline_one_hot
-    }
-
-    x_train, y_train, x_test, y_test, n_classes = datasets_dict[dataset](DTYPE)
+    set_result_context(dataset=dataset)
+    x_train, y_train, x_test, y_test, n_classes = DATASETS[dataset](DTYPE)
     print("n_classes: ", n_classes)
 
+    cat_features = CATEGORICAL_FEATURES.get(dataset, [])
+
 #     if n_classes == -1:
 #         lgb_params['objective'] = 'regression'
 #     elif n_classes == 2:
@@ -76,23 +73,34 @@ def parse_args():
     parser = argparse.ArgumentParser()
 #     parser.add_argument('--n_iter', required=False, type=int, default=1000)
     parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
-    parser.add_argument('--dataset', choices=['higgs1m', "airline-ohe", "msrank-10k"],
+    parser.add_argument('--dataset', choices=list(DATASETS), nargs='+',
             metavar='stage', required=True)
 
+    add_measure_args(parser)
     args = parser.parse_args()
+    apply_measure_args(args)
     N_PERF_RUNS = args.n_runs
 
-    load_dataset(args.dataset)
+    return args.dataset
 
 
 def main():
-    parse_args()
-
-    print("Running ...")
-    measure(xbg_fit,                   "XGBOOST training            ", N_PERF_RUNS)
-    measure(xgb_stock_predict, "XGBOOST Stock predict (test data)", N_PERF_RUNS)
-#     measure(xgb_daal_predict,  "XGBOOST Daal predict (test data) ", N_PERF_RUNS)
-   
+    datasets = parse_args()
+
+    results = []
+    for dataset in datasets:
+        load_dataset(dataset)
+
+        print("Running %s ..." % dataset)
+        fit_time = measure(xbg_fit,                   "XGBOOST training            ", N_PERF_RUNS)
+        predict_time = measure(xgb_stock_predict, "XGBOOST Stock predict (test data)", N_PERF_RUNS)
+#         measure(xgb_daal_predict,  "XGBOOST Daal predict (test data) ", N_PERF_RUNS)
+        results.append((dataset, x_train.shape[1], matrix_nbytes(x_train), fit_time, predict_time))
+
+    if len(results) > 1:
+        print("\n%-20s %10s %12s %14s %14s" % ("dataset", "features", "x_train MB", "training sec", "predict sec"))
+        for dataset, n_features, nbytes, fit_time, predict_time in results:
+            print("%-20s %10d %12.1f %14.4f %14.4f" % (dataset, n_features, nbytes / 2**20, fit_time, predict_time))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+from bench_utils import *
+from bench_utils import _record_result
+from inference_server import HOST, PORT, read_message, pack_message
+
+QPS = [100, 500, 1000, 2000]
+DURATION = 10.
+DTYPE=np.float32
+
+
+async def run_load(x, qps, duration, rows_per_request=1, port=PORT, poisson=False, seed=0):
+    """
+    Replays rows of x at `qps` requests per second for `duration` seconds,
+    open loop: requests go out on schedule whether or not earlier ones were
+    answered. Latency counts from the scheduled send time, so time spent
+    queued behind a slow server is included. Returns (latencies, elapsed, unanswered).
+    """
+    reader, writer = await asyncio.open_connection(HOST, port)
+    rng = np.random.RandomState(seed)
+    n_requests = int(qps * duration)
+    gaps = rng.exponential(1. / qps, n_requests) if poisson else np.full(n_requests, 1. / qps)
+    scheduled = np.cumsum(gaps) - gaps[0]
+    latencies = np.full(n_requests, np.nan)
+    pending = {}
+
+    async def receive():
+        while pending or not sending_done.is_set():
+            message = await read_message(reader)
+            if message is None:
+                break
+            message_id = message[0]
+            latencies[message_id] = timeit.default_timer() - start - scheduled[message_id]
+            pending.pop(message_id, None)
+            if not pending and sending_done.is_set():
+                break
+
+    sending_done = asyncio.Event()
+    start = timeit.default_timer()
+    receiver = asyncio.ensure_future(receive())
+    for i in range(n_requests):
+        delay = start + scheduled[i] - timeit.default_timer()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        first = (i * rows_per_request) % len(x)
+        rows = x[first:first + rows_per_request]
+        pending[i] = True
+        writer.write(pack_message(i, rows))
+    sending_done.set()
+    await writer.drain()
+    try:
+        await asyncio.wait_for(receiver, timeout=max(10., duration))
+    except asyncio.TimeoutError:
+        pass
+    elapsed = timeit.default_timer() - start
+    writer.close()
+    answered = latencies[~np.isnan(latencies)]
+    return answered, elapsed, n_requests - len(answered)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replays x_test rows against inference_server.py at fixed rates")
+    parser.add_argument('--dataset', choices=list(DATASETS), metavar='stage', required=True,
+                        help='data set whose x_test rows are sent')
+    parser.add_argument('--qps', nargs='+', type=float, default=QPS, help='target request rates to step through')
+    parser.add_argument('--duration', default=DURATION, type=float, help='seconds per rate')
+    parser.add_argument('--rows', default=1, type=int, help='rows per request')
+    parser.add_argument('--poisson', action='store_true', help='exponential inter-arrival times instead of even spacing')
+    parser.add_argument('--port', default=PORT, type=int)
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    return args
+
+
+def main():
+    args = parse_args()
+    from bench_runner import load_dataset
+    data = load_dataset(args.dataset, DTYPE)
+    x = data['x_test']
+    if issparse(x):
+        x = x.toarray()
+    x = np.ascontiguousarray(x, dtype=np.float32)
+
+    table = []
+    for qps in args.qps:
+        latencies, elapsed, unanswered = asyncio.run(
+            run_load(x, qps, args.duration, args.rows, args.port, args.poisson))
+        if not len(latencies):
+            print("%.0f qps: no answers" % qps)
+            continue
+        latency = latency_summary(latencies, args.rows)
+        latency['throughput'] = len(latencies) * args.rows / elapsed
+        set_result_context(dataset=args.dataset, target_qps=qps, rows_per_request=args.rows)
+        _record_result("target %.0f qps" % qps, run_load, latencies.tolist(), [0.] * len(latencies),
+                       latency=latency, unanswered=unanswered)
+        table.append((qps, len(latencies) / elapsed, latency, unanswered))
+        print("%.0f qps: p50 %.2f ms, p99 %.2f ms, p999 %.2f ms, %d unanswered" % (
+            qps, latency['p50'] * 1e3, latency['p99'] * 1e3, latency['p999'] * 1e3, unanswered))
+
+    print("\n%10s %12s %10s %10s %10s %11s" % ("target qps", "achieved qps", "p50 ms", "p99 ms", "p999 ms", "unanswered"))
+    for qps, achieved, latency, unanswered in table:
+        print("%10.0f %12.1f %10.2f %10.2f %10.2f %11d" % (qps, achieved, latency['p50'] * 1e3,
+                                                          latency['p99'] * 1e3, latency['p999'] * 1e3, unanswered))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import time
+import shutil
+import tarfile
+from bench_utils import *
+from bench_utils import _count_lines
+
+N_PERF_RUNS = 3
+DTYPE=np.float32
+N_FEATURES = 137
+N_JOBS = None
+# features left out of each generated row on top of the zeros
+SPARSITY = 0.3
+# generated rows with no features at all, only label and qid
+EMPTY_ROWS = 0.001
+
+
+def generate_msrank_like(filename, n_rows, sparsity=SPARSITY, seed=0):
+    """
+    Writes a LibSVM file shaped like MSRank: label, qid and 136 features.
+    With sparsity > 0, zeros and a `sparsity` fraction of the other features
+    are left out of each row and a few rows have no features at all, as the
+    parsers must fill absent indices; with 0 every index is written, which
+    the regex parser needs. Returns the (X, y) the file parses to.
+    """
+    rng = np.random.RandomState(seed)
+    X = np.zeros((n_rows, N_FEATURES), dtype=DTYPE)
+    y = np.zeros(n_rows, dtype=DTYPE)
+    with open(filename, 'w') as f:
+        for start in range(0, n_rows, 10000):
+            n = min(10000, n_rows - start)
+            labels = rng.randint(0, 5, n)
+            qids = rng.randint(1, 30000, n)
+            values = np.round(rng.exponential(10, (n, N_FEATURES - 1)), 6)
+            values[values < 2] = 0
+            written = np.ones(values.shape, dtype=bool)
+            if sparsity > 0:
+                written = (values != 0) & (rng.rand(*values.shape) >= sparsity)
+                written[rng.rand(n) < EMPTY_ROWS] = False
+            for r, (label, qid, row, keep) in enumerate(zip(labels, qids, values, written)):
+                pairs = ["%d:%g" % (i + 1, v) for i, v in zip(np.flatnonzero(keep), row[keep])]
+                f.write(" ".join(["%d qid:%d" % (label, qid)] + pairs) + "\n")
+                X[start + r, 0] = qid
+                for pair in pairs:
+                    index, value = pair.split(':')
+                    X[start + r, int(index)] = float(value)
+                y[start + r] = label
+    return X, y
+
+
+def legacy_parse():
+    global legacy_result
+    n_samples = _count_lines(file_name)
+    with open(file_name, 'r') as file_obj:
+        legacy_result = read_libsvm_msrank_legacy(file_obj, n_samples, N_FEATURES, DTYPE)
+
+
+def chunked_parse():
+    global chunked_result
+    with open(file_name, 'rb') as file_obj:
+        chunked_result = read_libsvm_msrank(file_obj, None, N_FEATURES, DTYPE)
+
+
+def parallel_parse():
+    global parallel_result
+    parallel_result, = read_libsvm_files_parallel([[file_name]], N_FEATURES, DTYPE, N_JOBS)
+
+
+def disk_bytes_written():
+    """Bytes this process sent to the storage layer so far (Linux only)."""
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return int(counters['write_bytes'])
+    except (IOError, KeyError, ValueError):
+        return 0
+
+
+def extract_then_read():
+    global extract_result, extracted_bytes
+    extract_dir = DATASET_DIR + "msrank_extract_bench/"
+    shutil.rmtree(extract_dir, ignore_errors=True)
+    written = disk_bytes_written()
+    with tarfile.open(archive_name, "r:gz") as tar:
+        tar.extractall(extract_dir)
+    splits = {}
+    for root, _, files in os.walk(extract_dir):
+        for name in files:
+            splits[name] = os.path.join(root, name)
+    groups = [[splits['train.txt'], splits['vali.txt']], [splits['test.txt']]]
+    extract_result = read_libsvm_files_parallel(groups, N_FEATURES, DTYPE, N_JOBS)
+    extracted_bytes.append(disk_bytes_written() - written)
+    shutil.rmtree(extract_dir, ignore_errors=True)
+
+
+def stream_from_archive():
+    global stream_result, streamed_bytes
+    written = disk_bytes_written()
+    stream_result = read_msrank_archive(archive_name, N_FEATURES, DTYPE)
+    streamed_bytes.append(disk_bytes_written() - written)
+
+
+def archive_main():
+    global extracted_bytes, streamed_bytes
+    extracted_bytes, streamed_bytes = [], []
+    print("Reading", archive_name, "({:.1f} MB)".format(os.path.getsize(archive_name) / 2**20))
+    measure(extract_then_read,   "Extract then read  ", N_PERF_RUNS)
+    measure(stream_from_archive, "Stream from archive", N_PERF_RUNS)
+
+    print("Disk bytes written: extract then read = {:.1f} MB, stream = {:.1f} MB".format(
+        np.mean(extracted_bytes) / 2**20, np.mean(streamed_bytes) / 2**20))
+    (x0, y0), (t0, u0) = extract_result
+    x1, y1, t1, u1 = stream_result
+    print("Results identical:", all(np.array_equal(a, b) for a, b in
+                                    [(x0, x1), (y0, y1), (t0, t1), (u0, u1)]))
+
+
+def parse_args():
+    global N_PERF_RUNS, N_JOBS, file_name, archive_name, expected_result, dense
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
+    parser.add_argument('--file', required=False, default=None,
+                        help='LibSVM file to parse, e.g. ./data/MSRank/train.txt')
+    parser.add_argument('--rows', required=False, type=int, default=200000,
+                        help='rows of synthetic MSRank-like data when --file is not given')
+    parser.add_argument('--sparsity', required=False, type=float, default=SPARSITY,
+                        help='fraction of features left out of the synthetic rows; 0 writes every '
+                             'index, which the regex parser needs [Default=%g]' % SPARSITY)
+    parser.add_argument('--jobs', required=False, type=int, default=None,
+                        help='worker processes for the parallel parser [Default=all cores]')
+    parser.add_argument('--archive', required=False, default=None,
+                        help='MSRank tar.gz: compare extract-then-read with streaming from the archive')
+
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    N_PERF_RUNS = args.n_runs
+    N_JOBS = args.jobs
+    archive_name = args.archive
+
+    file_name, expected_result, dense = args.file, None, True
+    if file_name is None:
+        try:
+            os.mkdir(DATASET_DIR)
+        except:
+            pass
+        dense = args.sparsity == 0
+        file_name = DATASET_DIR + ("msrank_like_%d.txt" % args.rows if dense else
+                                   "msrank_like_%d_sparsity%g.txt" % (args.rows, args.sparsity))
+        expected_file = file_name + ".expected.npz"
+        if os.path.isfile(file_name) and os.path.isfile(expected_file):
+            with np.load(expected_file) as f:
+                expected_result = f['X'], f['y']
+        else:
+            print("Generating", file_name)
+            expected_result = generate_msrank_like(file_name, args.rows, args.sparsity)
+            np.savez(expected_file, X=expected_result[0], y=expected_result[1])
+
+
+def main():
+    parse_args()
+
+    if archive_name is not None:
+        archive_main()
+        return
+
+    print("Parsing", file_name, "({:.1f} MB)".format(os.path.getsize(file_name) / 2**20))
+    if dense:
+        measure(legacy_parse,  "Regex parser   ", N_PERF_RUNS)
+    else:
+        print("Rows leave features out: the regex parser, which reads values by position, is skipped")
+    measure(chunked_parse, "Chunked parser ", N_PERF_RUNS)
+    measure(parallel_parse, "Parallel parser", N_PERF_RUNS)
+
+    X0, y0 = expected_result if expected_result is not None else legacy_result
+    for name, (X1, y1) in [("Chunked", chunked_result), ("Parallel", parallel_result)]:
+        print("%s results identical to %s:" % (name, "generated data" if expected_result is not None else "regex parser"),
+              np.array_equal(X0, X1) and np.array_equal(y0, y1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Dependency-light tree-ensemble predictor: the XGBoost or LightGBM model dump
+is compiled into flat struct-of-arrays node tables and evaluated with NumPy
+only, all trees and all rows of a chunk advancing one level per step.
+
+    forest = NumpyForest.from_xgboost(model_xgb)     # or from_lightgbm(model_lgb)
+    forest.predict(x_test)                           # same output as booster.predict
+
+Numerical splits only; categorical splits and linear trees are rejected.
+"""
+import json
+import numpy as np
+
+# LightGBM sends |x| <= kZeroThreshold down the default branch for missing_type=Zero
+LGB_ZERO_THRESHOLD = 1e-35
+
+
+class NumpyForest(object):
+    """
+    Node tables, one entry per node of every tree, children as global indices:
+    feature, threshold (go left if x < threshold), left, right, missing (child
+    for NaN), zero_missing (treat |x| <= 1e-35 as missing) and value (leaf
+    output). Leaves point to themselves, so extra levels leave rows in place.
+    """
+    # rows per evaluation chunk are chosen so rows * trees stays around this
+    CHUNK_CELLS = 2**22
+
+    def __init__(self, nodes, roots, tree_class, n_classes, base_margin, transform):
+        self.feature = np.asarray(nodes['feature'], dtype=np.intp)
+        self.threshold = np.asarray(nodes['threshold'], dtype=np.float64)
+        self.left = np.asarray(nodes['left'], dtype=np.intp)
+        self.right = np.asarray(nodes['right'], dtype=np.intp)
+        self.missing = np.asarray(nodes['missing'], dtype=np.intp)
+        self.zero_missing = np.asarray(nodes['zero_missing'], dtype=bool)
+        self.value = np.asarray(nodes['value'], dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.depth = nodes['depth']
+        self.n_classes = n_classes
+        self.base_margin = base_margin
+        self.transform = transform
+        # (trees x outputs) 0/1 matrix summing leaf values into per-class margins
+        n_outputs = 1 if n_classes <= 2 else n_classes
+        self.tree_outputs = np.zeros((len(roots), n_outputs))
+        self.tree_outputs[np.arange(len(roots)), np.asarray(tree_class) % n_outputs] = 1
+
+    @classmethod
+    def from_xgboost(cls, booster):
+        config = json.loads(booster.save_config())
+        learner = config['learner']
+        objective = learner['objective']['name']
+        n_classes = max(2, int(learner['learner_model_param']['num_class']))
+        base_score = _xgb_base_score(learner['learner_model_param']['base_score'], 1 if n_classes <= 2 else n_classes)
+        parallel = int(learner['gradient_booster'].get('gbtree_model_param', {}).get('num_parallel_tree', 1))
+        if learner['gradient_booster']['name'] != 'gbtree':
+            raise ValueError("only gbtree boosters can be compiled, not %s" % learner['gradient_booster']['name'])
+        names = {name: i for i, name in enumerate(booster.feature_names or [])}
+
+        if objective in ('binary:logistic', 'reg:logistic'):
+            transform, base_margin = 'sigmoid', np.log(base_score / (1 - base_score))
+        elif objective == 'multi:softprob':
+            transform, base_margin = 'softmax', base_score
+        elif objective == 'multi:softmax':
+            transform, base_margin = 'argmax', base_score
+        else:
+            transform, base_margin = 'identity', base_score
+
+        nodes, roots, tree_class = _empty_tables(), [], []
+        for i, dump in enumerate(booster.get_dump(dump_format='json')):
+            roots.append(len(nodes['feature']))
+            tree_class.append((i // parallel) % n_classes)
+            _add_xgb_tree(nodes, json.loads(dump), names)
+        return cls(nodes, roots, tree_class, n_classes, base_margin, transform)
+
+    @classmethod
+    def from_lightgbm(cls, booster):
+        model = booster.dump_model()
+        objective = model.get('objective', 'regression').split()
+        n_outputs = model['num_tree_per_iteration']
+        n_classes = max(2, model['num_class'])
+        if objective[0] == 'binary':
+            sigmoid = float(dict(part.split(':') for part in objective[1:] if ':' in part).get('sigmoid', 1))
+            transform = ('sigmoid', sigmoid)
+        elif objective[0] in ('multiclass', 'softmax'):
+            transform = 'softmax'
+        else:
+            transform = 'identity'
+
+        nodes, roots, tree_class = _empty_tables(), [], []
+        for i, tree in enumerate(model['tree_info']):
+            roots.append(len(nodes['feature']))
+            tree_class.append(i % n_outputs)
+            _add_lgb_node(nodes, tree['tree_structure'], 0)
+        return cls(nodes, roots, tree_class, n_classes, 0.0, transform)
+
+    def margin(self, x):
+        """Raw per-class scores, shape (n_rows, outputs)."""
+        x = np.asarray(x)
+        n_rows = x.shape[0]
+        out = np.empty((n_rows, self.tree_outputs.shape[1]))
+        step = max(1, self.CHUNK_CELLS // max(1, len(self.roots)))
+        for start in range(0, n_rows, step):
+            chunk = np.asarray(x[start:start + step], dtype=np.float64)
+            out[start:start + step] = self.value[self._leaves(chunk)] @ self.tree_outputs
+        return out + self.base_margin
+
+    def _leaves(self, x):
+        rows = np.arange(x.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (x.shape[0], len(self.roots))).copy()
+        for _ in range(self.depth):
+            values = x[rows, self.feature[node]]
+            missing = np.isnan(values)
+            if self.zero_missing.any():
+                missing |= self.zero_missing[node] & (np.abs(values) <= LGB_ZERO_THRESHOLD)
+            node = np.where(missing, self.missing[node],
+                            np.where(values < self.threshold[node], self.left[node], self.right[node]))
+        return node
+
+    def predict(self, x):
+        """Same output layout as booster.predict: P(class 1) for binary, (n_rows, classes) for multiclass."""
+        margin = self.margin(x)
+        transform = self.transform
+        if isinstance(transform, tuple):  # LightGBM sigmoid with its scale parameter
+            return 1. / (1. + np.exp(-transform[1] * margin[:, 0]))
+        if transform == 'sigmoid':
+            return 1. / (1. + np.exp(-margin[:, 0]))
+        if transform in ('softmax', 'argmax'):
+            e = np.exp(margin - margin.max(axis=1, keepdims=True))
+            probabilities = e / e.sum(axis=1, keepdims=True)
+            return probabilities if transform == 'softmax' else probabilities.argmax(axis=1).astype(np.float64)
+        return margin[:, 0] if margin.shape[1] == 1 else margin
+
+
+def _xgb_base_score(value, n_outputs):
+    """
+    base_score of the saved config as one value per output: a scalar string
+    before XGBoost 3.0, a vector string such as '[4.9933332E-1]' since, with
+    one entry per class for multiclass objectives.
+    """
+    values = np.array([float(part) for part in value.strip().strip('[]').split(',')])
+    return np.broadcast_to(values, (n_outputs,)).copy()
+
+
+def _empty_tables():
+    tables = dict((key, []) for key in ('feature', 'threshold', 'left', 'right', 'missing', 'zero_missing', 'value'))
+    tables['depth'] = 0
+    return tables
+
+
+def _add_leaf(nodes, index, value):
+    nodes['feature'].append(0)
+    nodes['threshold'].append(0.0)
+    nodes['left'].append(index)
+    nodes['right'].append(index)
+    nodes['missing'].append(index)
+    nodes['zero_missing'].append(False)
+    nodes['value'].append(value)
+
+
+def _add_xgb_tree(nodes, root, names):
+    """Appends one tree of get_dump(dump_format='json'); nodeids are local and pruning leaves gaps, so remap them."""
+    base = len(nodes['feature'])
+    flat = {}
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        flat[node['nodeid']] = node
+        nodes['depth'] = max(nodes['depth'], depth)
+        stack.extend((child, depth + 1) for child in node.get('children', []))
+
+    index = dict((nodeid, base + i) for i, nodeid in enumerate(sorted(flat)))
+    for nodeid in sorted(flat):
+        node = flat[nodeid]
+        if 'leaf' in node:
+            _add_leaf(nodes, index[nodeid], node['leaf'])
+            continue
+        if 'split_condition' not in node:
+            raise ValueError("categorical splits cannot be compiled")
+        split = node['split']
+        nodes['feature'].append(names[split] if split in names else int(split.lstrip('f')))
+        # XGBoost compares in float32; widening both sides to float64 keeps every comparison
+        nodes['threshold'].append(float(np.float32(node['split_condition'])))
+        nodes['left'].append(index[node['yes']])
+        nodes['right'].append(index[node['no']])
+        nodes['missing'].append(index[node['missing']])
+        nodes['zero_missing'].append(False)
+        nodes['value'].append(0.0)
+
+
+def _add_lgb_node(nodes, node, depth):
+    """Appends a LightGBM dump_model() subtree depth first; returns its global index."""
+    index = len(nodes['feature'])
+    nodes['depth'] = max(nodes['depth'], depth)
+    if 'leaf_value' in node:
+        if 'leaf_coeff' in node:
+            raise ValueError("linear trees cannot be compiled")
+        _add_leaf(nodes, index, node['leaf_value'])
+        return index
+    if node['decision_type'] != '<=':
+        raise ValueError("categorical splits cannot be compiled")
+
+    threshold = float(node['threshold'])
+    nodes['feature'].append(node['split_feature'])
+    # x <= t is x < nextafter(t), so one comparison serves both libraries
+    nodes['threshold'].append(np.nextafter(threshold, np.inf))
+    for key in ('left', 'right', 'missing', 'zero_missing', 'value'):
+        nodes[key].append(0)
+    left = _add_lgb_node(nodes, node['left_child'], depth + 1)
+    right = _add_lgb_node(nodes, node['right_child'], depth + 1)
+    nodes['left'][index] = left
+    nodes['right'][index] = right
+    default = left if node.get('default_left', True) else right
+    if node.get('missing_type') == 'NaN':
+        nodes['missing'][index] = default
+    elif node.get('missing_type') == 'Zero':
+        nodes['missing'][index] = default
+        nodes['zero_missing'][index] = True
+    else:  # no missing handling in this split: NaN is scored as 0.0
+        nodes['missing'][index] = left if 0.0 < nodes['threshold'][index] else right
+    nodes['value'][index] = 0.0
+    return index
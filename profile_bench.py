@@ -0,0 +1,241 @@
+"""
+Kernel-level profile of training and prediction. Every backend runs in a
+fresh interpreter whose stdout and stderr are redirected to a log under
+--log_dir, with XGBoost at verbosity=3 and LightGBM at debug verbosity.
+The kernel timers the libraries print are then parsed into a per-kernel
+breakdown and summed by category (histogram build, split evaluation,
+partition, prediction, ...).
+
+XGBoost prints its Monitor timers when a booster is freed. LightGBM prints
+its timers at process exit, and only when built with -DUSE_TIMETAG=ON; the
+stock wheels have none. --pythons runs the same profile under other
+interpreters, e.g. environments with stock and Intel-optimized builds, and
+prints them side by side. With --profile-python every measured phase is
+also profiled with cProfile.
+"""
+import gc
+import argparse
+import tempfile
+import subprocess
+import collections
+from bench_utils import *
+from backends import BACKENDS, XGBStock, LGBStock
+
+N_PERF_RUNS = 1
+DTYPE=np.float32
+LOG_DIR = "./logs/profile/"
+
+XGB_MONITOR = re.compile(r'=+ Monitor \((\d+)\): *(\S*) =+')
+XGB_TIMER = re.compile(r'\] (\w+): ([0-9.e+-]+)s, (\d+) calls @ \d+us')
+LGB_TIMER = re.compile(r'\[LightGBM\] \[Info\] (\S+) costs:\s*([0-9.e+-]+)')
+
+# Kernel names by category, matched on the part after the last '::'.
+KERNEL_CATEGORIES = [
+    ('histogram build', ['BuildHistogram', 'BuildLocalHistograms', 'SyncHistograms', 'ConstructHistograms',
+                         'InitRoot']),
+    ('split evaluation', ['EvaluateSplits', 'FindBestSplitsFromHistograms']),
+    ('partition', ['UpdatePosition', 'ApplySplit', 'LeafPartition', 'Split', 'InitData', 'BeforeTrain']),
+    ('prediction', ['PredictRaw', 'PredictBatch', 'Predict']),
+    # training scores updated with the new tree, not prediction on new data
+    ('score update', ['UpdatePredictionCache', 'UpdateScore']),
+    ('binning', ['MakeCuts', 'PushRowPage']),
+    ('gradient', ['GetGradient', 'Boosting']),
+    ('communication', ['AllReduce']),
+]
+# Timers around other timers; listed per kernel but left out of the category sums.
+ENCLOSING_KERNELS = ['UpdateOneIter', 'BoostNewTrees', 'UpdateTree', 'Configure', 'EvalOneIter', 'CommitModel',
+                     'Train', 'TrainOneIter', 'FindBestSplits']
+LGB_NO_TIMERS = "no kernel timers in the log: LightGBM prints them only when built with -DUSE_TIMETAG=ON"
+
+
+def kernel_category(kernel):
+    if kernel in ENCLOSING_KERNELS:
+        return 'enclosing'
+    for category, kernels in KERNEL_CATEGORIES:
+        if kernel in kernels:
+            return category
+    return 'other'
+
+
+def parse_kernel_log(text):
+    """Kernel timers of an XGBoost or LightGBM log, summed per (library, component, kernel)."""
+    totals = collections.OrderedDict()
+    component = ''
+    for line in text.splitlines():
+        match = XGB_MONITOR.search(line)
+        if match:
+            component = match.group(2) or 'unnamed'
+            continue
+        match = XGB_TIMER.search(line)
+        if match:
+            key, seconds, calls = ('xgboost', component, match.group(1)), float(match.group(2)), int(match.group(3))
+        else:
+            match = LGB_TIMER.search(line)
+            if not match:
+                continue
+            owner, _, name = match.group(1).rpartition('::')
+            key, seconds, calls = ('lightgbm', owner, name), float(match.group(2)), None
+        entry = totals.setdefault(key, {'seconds': 0., 'calls': 0 if calls is not None else None})
+        entry['seconds'] += seconds
+        if calls is not None:
+            entry['calls'] += calls
+    return [{'library': library, 'component': component, 'kernel': kernel, 'category': kernel_category(kernel),
+             'seconds': entry['seconds'], 'calls': entry['calls']}
+            for (library, component, kernel), entry in totals.items()]
+
+
+def category_seconds(kernels):
+    totals = collections.OrderedDict((category, 0.) for category, _ in KERNEL_CATEGORIES + [('other', [])])
+    for kernel in kernels:
+        if kernel['category'] != 'enclosing':
+            totals[kernel['category']] += kernel['seconds']
+    return totals
+
+
+def run_worker(args):
+    """Runs one backend with kernel logging on; the parent reads its stdout and --results."""
+    from bench_runner import load_dataset
+    data = load_dataset(args.dataset, DTYPE)
+    backend = BACKENDS[args.worker](data, n_iter=args.n_iter, preset=args.preset)
+    backend.setup()
+    if isinstance(backend, XGBStock):
+        import xgboost as xgb
+        xgb.set_config(verbosity=3)
+        backend.params['verbosity'] = 3
+    elif isinstance(backend, LGBStock):
+        backend.params['verbose'] = 2
+    for phase, func in backend.phases():
+        set_result_context(dataset=args.dataset, backend=args.worker, phase=phase)
+        measure(func, "%-10s %-12s" % (args.worker, phase), args.n_runs)
+    # XGBoost prints the Monitor timers of a booster when it is freed
+    del backend
+    gc.collect()
+
+
+def profile_backend(python, name, args, log_path, profile_dir=None):
+    """Runs a worker under `python`; returns (records, kernels) or None if it failed."""
+    fd, results_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    command = [python, '-u', os.path.abspath(__file__), '--worker', name, '--dataset', args.dataset,
+               '--n_runs', str(args.n_runs), '--warmup', str(args.warmup), '--results', results_path, '--no-history']
+    if args.n_iter:
+        command += ['--n_iter', str(args.n_iter)]
+    if args.preset:
+        command += ['--preset', args.preset]
+    if profile_dir:
+        command += ['--profile-python', profile_dir]
+    try:
+        with open(log_path, 'w') as log:
+            code = subprocess.call(command, stdout=log, stderr=subprocess.STDOUT)
+        with open(log_path) as log:
+            text = log.read()
+        if code != 0:
+            print("%s under %s failed with code %d, log %s:\n%s" % (name, python, code, log_path, text[-2000:]))
+            return None
+        with open(results_path) as f:
+            records = json.load(f)['measurements']
+    finally:
+        os.remove(results_path)
+    return records, parse_kernel_log(text)
+
+
+def print_profiles(runs):
+    labels = [run['label'] for run in runs]
+    phases = []
+    for run in runs:
+        phases += [phase for phase in run['phases'] if phase not in phases]
+    width = max(14, max(len(label) for label in labels) + 2)
+
+    def row(name, values, fmt="%.4f"):
+        print("%-44s" % name[:44] + "".join(("%*s" % (width, fmt % v)) if v is not None else "%*s" % (width, "-")
+                                            for v in values))
+
+    print("\n%-44s" % "phase sec" + "".join("%*s" % (width, label) for label in labels))
+    for phase in phases:
+        row(phase, [run['phases'].get(phase) for run in runs])
+
+    print("\n%-44s" % "kernel category sec" + "".join("%*s" % (width, label) for label in labels))
+    categories = [category_seconds(run['kernels']) for run in runs]
+    for category in categories[0]:
+        row(category, [c[category] if run['kernels'] else None for c, run in zip(categories, runs)])
+
+    keys = []
+    for run in runs:
+        keys += [(k['library'], k['component'], k['kernel']) for k in run['kernels']
+                 if (k['library'], k['component'], k['kernel']) not in keys]
+    if keys:
+        print("\n%-44s" % "kernel sec (calls)" + "".join("%*s" % (width, label) for label in labels))
+        for key in keys:
+            cells = []
+            for run in runs:
+                match = [k for k in run['kernels'] if (k['library'], k['component'], k['kernel']) == key]
+                cells.append(match[0] if match else None)
+            print("%-44s" % ("%s %s.%s" % key)[:44] + "".join(
+                "%*s" % (width, ("%.4f (%d)" % (k['seconds'], k['calls']) if k['calls'] is not None
+                                 else "%.4f" % k['seconds']) if k else "-") for k in cells))
+    for run in runs:
+        if not run['kernels'] and run['name'].startswith('lgb'):
+            print("%s: %s" % (run['label'], LGB_NO_TIMERS))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-kernel timing of training and prediction from library logs")
+    parser.add_argument('--dataset', choices=list(DATASETS), metavar='stage', required=True)
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=['xgb-stock', 'lgb-stock'])
+    parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
+    parser.add_argument('--n_iter', default=None, required=False, type=int,
+                        help='boosting rounds [Default=n_estimators of the preset]')
+    parser.add_argument('--preset', default=None, choices=['binary', 'msrank'],
+                        help='parameter preset [Default=by data set]')
+    parser.add_argument('--pythons', nargs='+', default=[sys.executable],
+                        help='interpreters to profile under, e.g. one per environment [Default=this one]')
+    parser.add_argument('--log_dir', default=LOG_DIR, help='where the raw library logs are kept')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        run_worker(args)
+        return
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    runs = []
+    for i, python in enumerate(args.pythons):
+        for name in args.backends:
+            label = name if len(args.pythons) == 1 else "%s#%d" % (name, i + 1)
+            log_path = os.path.join(args.log_dir, "%s-%s.log" % (args.dataset, label))
+            print("Profiling %s under %s, log %s ..." % (name, python, log_path))
+            profile_dir = args.profile_python
+            if profile_dir and len(args.pythons) > 1:
+                profile_dir = os.path.join(profile_dir, str(i + 1))
+            profile = profile_backend(python, name, args, log_path, profile_dir)
+            if profile is None:
+                continue
+            records, kernels = profile
+            for record in records:
+                record['context'].update(python=python)
+                record['kernels'] = kernels
+            RESULTS.extend(records)
+            runs.append({'label': label, 'name': name, 'python': python, 'kernels': kernels,
+                         'versions': records[0]['versions'] if records else {},
+                         'phases': dict((r['context']['phase'], r['stats']['median']) for r in records)})
+    if not runs:
+        sys.exit("Nothing was profiled")
+
+    if len(args.pythons) > 1:
+        for i, python in enumerate(args.pythons):
+            versions = {}
+            for run in runs:
+                if run['python'] == python:
+                    versions.update(run['versions'])
+            print("#%d = %s %s" % (i + 1, python, ", ".join("%s %s" % item for item in sorted(versions.items()))))
+    print_profiles(runs)
+
+
+if __name__ == '__main__':
+    main()
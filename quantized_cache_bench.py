@@ -0,0 +1,81 @@
+import argparse
+import shutil
+import xgboost as xgb
+import lightgbm as lgb
+from bench_utils import *
+from bench_runner import load_dataset
+from backends import xgb_params_for, lgb_params_for
+
+N_PERF_RUNS = 3
+N_ITER = 100
+DTYPE=np.float32
+
+
+def lgb_raw():
+    train = lgb.Dataset(x_train, y_train, params=lgb_params, categorical_feature=categorical,
+                        free_raw_data=False).construct()
+    lgb.train(lgb_params, train, N_ITER)
+
+def lgb_cold():
+    shutil.rmtree(lgb_quantized_path(dataset, x_train, y_train, lgb_params, categorical), ignore_errors=True)
+    lgb.train(lgb_params, lgb_quantized_dataset(dataset, x_train, y_train, lgb_params, categorical), N_ITER)
+
+def lgb_warm():
+    lgb.train(lgb_params, lgb_quantized_dataset(dataset, x_train, y_train, lgb_params, categorical), N_ITER)
+
+def xgb_dmatrix():
+    xgb.train(xgb_params, xgb.DMatrix(x_train, y_train, **xgb_matrix_args), N_ITER)
+
+def xgb_quantile():
+    train = xgb.QuantileDMatrix(x_train, y_train, max_bin=xgb_params['max_bin'], **xgb_matrix_args)
+    xgb.train(xgb_params, train, N_ITER)
+
+
+def parse_args():
+    global N_PERF_RUNS, N_ITER
+    parser = argparse.ArgumentParser(
+        description="End-to-end matrix construction plus training, with and without pre-quantized data")
+    parser.add_argument('--dataset', choices=list(DATASETS), metavar='stage', required=True)
+    parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
+    parser.add_argument('--n_iter', default=N_ITER, required=False, type=int)
+    add_measure_args(parser)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    N_PERF_RUNS = args.n_runs
+    N_ITER = args.n_iter
+    return args
+
+
+def main():
+    global dataset, x_train, y_train, categorical, lgb_params, xgb_params, xgb_matrix_args
+    args = parse_args()
+
+    data = load_dataset(args.dataset, DTYPE)
+    dataset, x_train, y_train = data['dataset'], data['x_train'], data['y_train']
+    categorical = data['cat_features'] or 'auto'
+    lgb_params = lgb_params_for(data)
+    lgb_params.pop('n_estimators')
+    xgb_params = xgb_params_for(data)
+    xgb_params.pop('n_estimators')
+    xgb_matrix_args = {}
+    if data['cat_features']:
+        xgb_matrix_args = {'enable_categorical': True, 'feature_types':
+                           ['c' if i in data['cat_features'] else 'q' for i in range(x_train.shape[1])]}
+
+    print("Running ...")
+    rows = [
+        ("LightGBM", "lgb.Dataset from arrays", measure(lgb_raw, "LGB raw Dataset + training     ", N_PERF_RUNS)),
+        ("LightGBM", "build + save_binary", measure(lgb_cold, "LGB quantize, save + training  ", N_PERF_RUNS)),
+        ("LightGBM", "load saved binary", measure(lgb_warm, "LGB load quantized + training  ", N_PERF_RUNS)),
+        ("XGBoost", "DMatrix", measure(xgb_dmatrix, "XGB DMatrix + training         ", N_PERF_RUNS)),
+        ("XGBoost", "QuantileDMatrix", measure(xgb_quantile, "XGB QuantileDMatrix + training ", N_PERF_RUNS)),
+    ]
+
+    baseline = {"LightGBM": rows[0][2], "XGBoost": rows[3][2]}
+    print("\n%-10s %-26s %14s %12s" % ("library", "training matrix", "end-to-end s", "saved s"))
+    for library, matrix, seconds in rows:
+        print("%-10s %-26s %14.4f %12.4f" % (library, matrix, seconds, baseline[library] - seconds))
+
+
+if __name__ == '__main__':
+    main()
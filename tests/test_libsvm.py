@@ -0,0 +1,63 @@
+"""The LibSVM row counter and parsers agree on CRLF files, blank lines and whitespace-only tails."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import bench_utils
+
+N_FEATURES = 4
+ROWS = [(1, {0: 3, 1: 0.5, 3: 2.0}), (0, {0: 3, 2: -1.0}), (2, {0: 7, 1: 1.5, 2: 0.25, 3: 4.0})]
+
+CASES = {
+    'lf': "1 qid:3 1:0.5 3:2\n0 qid:3 2:-1\n2 qid:7 1:1.5 2:0.25 3:4\n",
+    'crlf': "1 qid:3 1:0.5 3:2\r\n0 qid:3 2:-1\r\n2 qid:7 1:1.5 2:0.25 3:4\r\n",
+    'crlf blank lines': "\r\n1 qid:3 1:0.5 3:2\r\n\r\n\r\n0 qid:3 2:-1\r\n \t\r\n2 qid:7 1:1.5 2:0.25 3:4\r\n\r\n",
+    'no final newline': "1 qid:3 1:0.5 3:2\n0 qid:3 2:-1\n2 qid:7 1:1.5 2:0.25 3:4",
+    'whitespace tail': "1 qid:3 1:0.5 3:2\n0 qid:3 2:-1\n2 qid:7 1:1.5 2:0.25 3:4\n\n  \t",
+    'crlf whitespace tail': "1 qid:3 1:0.5 3:2\r\n0 qid:3 2:-1\r\n2 qid:7 1:1.5 2:0.25 3:4\r\n \r\n\r\n ",
+}
+
+
+def expected():
+    X = np.zeros((len(ROWS), N_FEATURES), dtype=np.float32)
+    for i, (_, features) in enumerate(ROWS):
+        for j, value in features.items():
+            X[i, j] = value
+    return X, np.array([label for label, _ in ROWS], dtype=np.float32)
+
+
+@pytest.fixture(params=sorted(CASES))
+def libsvm_file(request, tmp_path):
+    path = str(tmp_path / "data.txt")
+    with open(path, 'wb') as f:
+        f.write(CASES[request.param].encode())
+    return path
+
+
+@pytest.fixture(params=[3, 2**20], ids=['tiny chunks', 'one chunk'])
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(bench_utils, 'LIBSVM_CHUNK_SIZE', request.param)
+    return request.param
+
+
+def test_count_matches_rows(libsvm_file, chunk_size):
+    size = os.path.getsize(libsvm_file)
+    assert bench_utils._count_libsvm_rows((libsvm_file, 0, size)) == len(ROWS)
+
+
+def test_parallel_reader(libsvm_file, chunk_size):
+    (X, y), = bench_utils.read_libsvm_files_parallel([[libsvm_file]], N_FEATURES, np.float32, n_jobs=1)
+    X_expected, y_expected = expected()
+    np.testing.assert_array_equal(X, X_expected)
+    np.testing.assert_array_equal(y, y_expected)
+
+
+def test_chunked_reader(libsvm_file, chunk_size):
+    with open(libsvm_file, 'rb') as f:
+        X, y = bench_utils.read_libsvm_msrank(f, None, N_FEATURES, np.float32)
+    X_expected, y_expected = expected()
+    np.testing.assert_array_equal(X, X_expected)
+    np.testing.assert_array_equal(y, y_expected)
@@ -0,0 +1,61 @@
+"""NumpyForest predicts what the installed XGBoost and LightGBM predict for the same booster."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from numpy_forest import NumpyForest, _xgb_base_score
+
+N_ROWS = 2000
+N_ROUNDS = 10
+
+
+def make_data(n_classes):
+    rs = np.random.RandomState(0)
+    # float32 like the benchmarks' DTYPE: XGBoost splits float32 values
+    X = rs.standard_normal((N_ROWS, 6)).astype(np.float32)
+    X[rs.rand(*X.shape) < 0.05] = np.nan
+    if n_classes == -1:
+        y = 3 * np.nan_to_num(X[:, 0]) + np.nan_to_num(X[:, 1]) + 5
+    else:
+        # unbalanced classes, so a boosted-from-average base score is not 0.5
+        y = np.digitize(np.nan_to_num(X[:, 0]) + 0.5 * rs.standard_normal(N_ROWS),
+                        np.linspace(-0.5, 1.5, n_classes - 1))
+    return X, y
+
+
+@pytest.mark.parametrize("value, n_outputs, expected", [
+    ("0.5", 1, [0.5]),
+    ("5E-1", 3, [0.5, 0.5, 0.5]),
+    ("[3.75E-1]", 1, [0.375]),
+    ("[-2.3358035E-1,3.3475685E-1,3.1953597E-1]", 3, [-0.23358035, 0.33475685, 0.31953597]),
+])
+def test_xgb_base_score(value, n_outputs, expected):
+    np.testing.assert_allclose(_xgb_base_score(value, n_outputs), expected)
+
+
+@pytest.mark.parametrize("objective, n_classes", [
+    ('binary:logistic', 2), ('multi:softprob', 4), ('reg:squarederror', -1)])
+def test_xgboost_parity(objective, n_classes):
+    xgb = pytest.importorskip("xgboost")
+    X, y = make_data(n_classes)
+    params = {'objective': objective, 'max_depth': 4, 'nthread': 1}
+    if n_classes > 2:
+        params['num_class'] = n_classes
+    booster = xgb.train(params, xgb.DMatrix(X, label=y), N_ROUNDS)
+    np.testing.assert_allclose(NumpyForest.from_xgboost(booster).predict(X),
+                               booster.predict(xgb.DMatrix(X)), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("objective, n_classes", [('binary', 2), ('multiclass', 4), ('regression', -1)])
+def test_lightgbm_parity(objective, n_classes):
+    lgb = pytest.importorskip("lightgbm")
+    X, y = make_data(n_classes)
+    params = {'objective': objective, 'num_leaves': 15, 'num_threads': 1, 'verbose': -1}
+    if n_classes > 2:
+        params['num_class'] = n_classes
+    booster = lgb.train(params, lgb.Dataset(X, y), N_ROUNDS)
+    np.testing.assert_allclose(NumpyForest.from_lightgbm(booster).predict(X), booster.predict(X),
+                               rtol=1e-5, atol=1e-6)
@@ -0,0 +1,88 @@
+import argparse
+from bench_utils import *
+from bench_runner import load_dataset, share_data, run_shared
+from backends import BACKENDS
+
+N_PERF_RUNS = 3
+# each thread count starts a fresh process, so its first call pays cold caches and pool start-up
+N_WARMUP = 1
+DTYPE=np.float32
+
+
+def thread_counts(n_cores):
+    counts, n = [], 1
+    while n < n_cores:
+        counts.append(n)
+        n *= 2
+    return counts + [n_cores]
+
+
+def print_scaling(sweep):
+    """sweep: {n_threads: {backend: {phase: seconds}}}; speedup and efficiency against the fewest threads."""
+    counts = sorted(sweep)
+    rows = []
+    for n in counts:
+        for name, phases in sweep[n].items():
+            for phase in phases:
+                if (name, phase) not in rows:
+                    rows.append((name, phase))
+
+    print("\n%-10s %-12s %8s %10s %9s %11s" % ("backend", "phase", "threads", "sec", "speedup", "efficiency"))
+    for name, phase in rows:
+        timings = [(n, sweep[n][name][phase]) for n in counts if phase in sweep[n].get(name, {})]
+        if not timings:
+            continue
+        base_n, base = timings[0]
+        for n, seconds in timings:
+            speedup = base / seconds
+            print("%-10s %-12s %8d %10.4f %9.2f %10.0f%%" % (
+                name, phase, n, seconds, speedup, 100 * speedup * base_n / n))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Runs each backend at 1, 2, 4, ... threads pinned to physical cores")
+    parser.add_argument('--dataset', choices=list(DATASETS), metavar='stage', required=True)
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
+    parser.add_argument('--n_iter', default=None, required=False, type=int,
+                        help='boosting rounds [Default=n_estimators of the preset]')
+    parser.add_argument('--preset', default=None, choices=['binary', 'msrank'],
+                        help='parameter preset [Default=by data set]')
+    parser.add_argument('--threads', nargs='+', type=int, default=None,
+                        help='thread counts to run [Default=powers of two up to the physical core count]')
+    add_measure_args(parser)
+    parser.set_defaults(warmup=N_WARMUP)
+    args = parser.parse_args()
+    apply_measure_args(args)
+    return args
+
+
+def main():
+    args = parse_args()
+
+    cores = physical_cores()
+    counts = args.threads or thread_counts(len(cores))
+    if max(counts) > len(cores):
+        print("Warning: only %d physical cores, threads beyond that share cores" % len(cores))
+    print("Physical cores:", cores)
+
+    data = load_dataset(args.dataset, DTYPE)
+    blocks, desc = share_data(data)
+    sweep = {}
+    try:
+        for n in counts:
+            cpus = [cores[i % len(cores)] for i in range(n)]
+            print("Running with %d thread(s) on CPUs %s ..." % (n, sorted(set(cpus))))
+            sweep[n] = run_shared(args.backends, desc, args.n_runs, args.n_iter, args.preset,
+                                  args.warmup, n_threads=n, cpus=cpus)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    print_scaling(sweep)
+
+
+if __name__ == '__main__':
+    main()
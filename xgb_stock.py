@@ -6,7 +6,8 @@ from bench_utils import *
 N_PERF_RUNS = 5
 DTYPE=np.float32
 
-xgb_params = {
+# per data set, xgb_params is a fresh copy of these plus the objective
+XGB_PARAMS = {
     'verbosity':                    0,
     'alpha':                        0.9,
     'max_bin':                      256,
@@ -22,39 +23,43 @@ xgb_params = {
     'n_estimators':                 1000
 }
 
+def make_dmatrix(data, label=None):
+    if cat_features:
+        return xgb.DMatrix(data, label=label, feature_types=feature_types, enable_categorical=True)
+    return xgb.DMatrix(data, label=label)
+
 def xbg_fit():
     global model_xgb
-    dtrain = xgb.DMatrix(x_train, label=y_train)
+    dtrain = make_dmatrix(x_train, label=y_train)
     model_xgb = xgb.train(xgb_params, dtrain, xgb_params['n_estimators'])
 
 def xgb_predict_of_train_data():
     global result_predict_xgb_train
-    dtest = xgb.DMatrix(x_train)
+    dtest = make_dmatrix(x_train)
     result_predict_xgb_train = model_xgb.predict(dtest)
 
 def xgb_predict_of_test_data():
     global result_predict_xgb_test
-    dtest = xgb.DMatrix(x_test)
+    dtest = make_dmatrix(x_test)
     result_predict_xgb_test = model_xgb.predict(dtest)
 
 
 def load_dataset(dataset):
-    global x_train, y_train, x_test, y_test, n_classes
+    global x_train, y_train, x_test, y_test, n_classes, cat_features, feature_types, xgb_params
 
     try:
         os.mkdir(DATASET_DIR)
     except:
         pass
 
-    datasets_dict = {
-        'higgs1m': load_higgs1m,
-        'msrank-10k': load_msrank_10k,
-        'airline-ohe':load_airline_one_hot
-    }
-
-    x_train, y_train, x_test, y_test, n_classes = datasets_dict[dataset](DTYPE)
+    set_result_context(dataset=dataset)
+    x_train, y_train, x_test, y_test, n_classes = DATASETS[dataset](DTYPE)
     print("n_classes: ", n_classes)
 
+    cat_features = CATEGORICAL_FEATURES.get(dataset, [])
+    feature_types = ['c' if i in cat_features else 'q' for i in range(x_train.shape[1])]
+
+    xgb_params = dict(XGB_PARAMS)
     if n_classes == -1:
         xgb_params['objective'] = 'reg:squarederror'
     elif n_classes == 2:
@@ -70,23 +75,34 @@ def parse_args():
     parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
 #     parser.add_argument('--hw', choices=['cpu', 'gpu'], metavar='stage', required=False, default='cpu')
 #     parser.add_argument('--log', metavar='stage', required=False, type=bool, default=False)
-    parser.add_argument('--dataset', choices=['higgs1m', "airline-ohe", "msrank-10k"],
+    parser.add_argument('--dataset', choices=list(DATASETS), nargs='+',
             metavar='stage', required=True)
 
+    add_measure_args(parser)
     args = parser.parse_args()
+    apply_measure_args(args)
     N_PERF_RUNS = args.n_runs
 
-    load_dataset(args.dataset)
+    return args.dataset
 
 
 def main():
-    parse_args()
-
-    print("Running ...")
-    measure(xbg_fit,                   "XGBOOST training            ", N_PERF_RUNS)
-#     measure(xgb_predict_of_train_data, "XGBOOST predict (train data)", N_PERF_RUNS)
-    measure(xgb_predict_of_test_data,  "XGBOOST predict (test data) ", N_PERF_RUNS)
-   
+    datasets = parse_args()
+
+    results = []
+    for dataset in datasets:
+        load_dataset(dataset)
+
+        print("Running %s ..." % dataset)
+        fit_time = measure(xbg_fit,                   "XGBOOST training            ", N_PERF_RUNS)
+#         measure(xgb_predict_of_train_data, "XGBOOST predict (train data)", N_PERF_RUNS)
+        predict_time = measure(xgb_predict_of_test_data,  "XGBOOST predict (test data) ", N_PERF_RUNS)
+        results.append((dataset, x_train.shape[1], matrix_nbytes(x_train), fit_time, predict_time))
+
+    if len(results) > 1:
+        print("\n%-20s %10s %12s %14s %14s" % ("dataset", "features", "x_train MB", "training sec", "predict sec"))
+        for dataset, n_features, nbytes, fit_time, predict_time in results:
+            print("%-20s %10d %12.1f %14.4f %14.4f" % (dataset, n_features, nbytes / 2**20, fit_time, predict_time))
 
 
 if __name__ == '__main__':
@@ -3,6 +3,7 @@ import xgboost as xgb
 import daal4py as d4p
 import time
 from bench_utils import *
+from numpy_forest import NumpyForest
 
 N_PERF_RUNS = 5
 DTYPE=np.float32
@@ -34,10 +35,16 @@ xgb_params = {
         "num_class": 5
 }
 
+def xgb_build():
+    global dtrain
+    dtrain = xgb.DMatrix(x_train, y_train)
+
 def xgb_fit():
-    global model_xgb, daal_model
-    dtrain = xgb.DMatrix(x_train, y_train)  
+    global model_xgb
     model_xgb = xgb.train(xgb_params, dtrain, num_boost_round=100)
+
+def xgb_convert():
+    global daal_model
     daal_model = d4p.get_gbt_model_from_xgboost(model_xgb)
 
 def xgb_stock_predict():
@@ -49,6 +56,14 @@ def xgb_daal_predict():
     global daal_prediction_test
     daal_prediction_test = d4p.gbt_classification_prediction(nClasses = n_classes, resultsToEvaluate="computeClassLabels", fptype='float').compute(x_test, daal_model)
 
+def xgb_numpy_compile():
+    global numpy_forest
+    numpy_forest = NumpyForest.from_xgboost(model_xgb)
+
+def xgb_numpy_predict():
+    global numpy_prediction_test
+    numpy_prediction_test = numpy_forest.predict(x_test)
+
 
 def load_dataset(dataset):
     global x_train, y_train, x_test, y_test, n_classes
@@ -58,13 +73,8 @@ def load_dataset(dataset):
     except:
         pass
 
-    datasets_dict = {
-        'higgs1m': load_higgs1m,
-        'msrank-10k': load_msrank_10k,
-        'airline-ohe':load_airline_one_hot
-    }
-
-    x_train, y_train, x_test, y_test, n_classes = datasets_dict[dataset](DTYPE)
+    set_result_context(dataset=dataset)
+    x_train, y_train, x_test, y_test, n_classes = DATASETS[dataset](DTYPE)
     print("n_classes: ", n_classes)
 
 #     if n_classes == -1:
@@ -80,23 +90,54 @@ def parse_args():
     parser = argparse.ArgumentParser()
 #     parser.add_argument('--n_iter', required=False, type=int, default=1000)
     parser.add_argument('--n_runs', default=N_PERF_RUNS, required=False, type=int)
-    parser.add_argument('--dataset', choices=['higgs1m', "airline-ohe", "msrank-10k"],
+    parser.add_argument('--dataset', choices=list(DATASETS),
             metavar='stage', required=True)
+    parser.add_argument('--predict_only', nargs='?', const='latest', default=None, metavar='MODEL',
+            help='skip training and conversion: reuse the models saved by the last run on this '
+                 'data set, or the given model key')
 
+    add_measure_args(parser)
     args = parser.parse_args()
+    apply_measure_args(args)
     N_PERF_RUNS = args.n_runs
 
     load_dataset(args.dataset)
+    return args
 
 
 def main():
-    parse_args()
+    global model_xgb, daal_model
+    args = parse_args()
+    model_name = "xgb_stock_daal-" + args.dataset
+
+    if args.predict_only:
+        model_xgb, daal_model, meta = load_models(model_name if args.predict_only == 'latest' else args.predict_only)
+        if daal_model is None:
+            raise SystemExit("model %s has no daal4py conversion saved" % meta['key'])
+        print("Running predictions only ...")
+        measure(xgb_stock_predict, "XGBOOST Stock predict (test data)", N_PERF_RUNS)
+        measure(xgb_daal_predict,  "XGBOOST Daal predict (test data) ", N_PERF_RUNS)
+        xgb_numpy_compile()
+        measure(xgb_numpy_predict, "XGBOOST NumPy predict (test data)", N_PERF_RUNS)
+        print_parity("NumPy forest", numpy_prediction_test, result_predict_xgb_test)
+        return
 
     print("Running ...")
+    # the DMatrix is built once and shared by every training repeat
+    measure(xgb_build,                 "XGBOOST DMatrix build       ", 1, warmup=0)
     measure(xgb_fit,                   "XGBOOST training            ", N_PERF_RUNS)
-    measure(xgb_stock_predict, "XGBOOST Stock predict (test data)", N_PERF_RUNS)
-    measure(xgb_daal_predict,  "XGBOOST Daal predict (test data) ", N_PERF_RUNS)
-   
+    # saved before conversion, which sets feature names on the booster
+    key = save_models(model_xgb, name=model_name, dataset=args.dataset, n_classes=n_classes)
+    # stock prediction goes first for the same reason
+    stock = measure(xgb_stock_predict, "XGBOOST Stock predict (test data)", N_PERF_RUNS)
+    convert = measure(xgb_convert,     "XGBOOST Daal conversion     ", N_PERF_RUNS)
+    save_daal_model(key, daal_model)
+    daal = measure(xgb_daal_predict,   "XGBOOST Daal predict (test data) ", N_PERF_RUNS)
+    print_break_even(convert, stock, daal)
+    measure(xgb_numpy_compile,         "XGBOOST NumPy forest compile", N_PERF_RUNS)
+    measure(xgb_numpy_predict,         "XGBOOST NumPy predict (test data)", N_PERF_RUNS)
+    print_parity("NumPy forest", numpy_prediction_test, result_predict_xgb_test)
+
 
 if __name__ == '__main__':
     main()